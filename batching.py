@@ -0,0 +1,131 @@
+"""
+Micro-batching and coalescing of concurrent blocking calls.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects items submitted from different threads into small batches.
+
+    The first submitted item opens a batch together with any items already
+    queued. Under load — more than one item queued or a batch still running —
+    the batch waits until ``max_batch`` items are collected or ``max_wait_ms``
+    elapses; a lone item is dispatched at once, so an idle batcher adds no
+    latency. ``batch_fn`` receives the list of items and must return a list
+    of results in the same order. Each caller blocks in ``submit`` until its
+    own result is ready.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], *, max_batch: int = 16,
+                 max_wait_ms: float = 50, max_inflight: int = 4, name: str = "batcher") -> None:
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix=name)
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._running = 0  # batches currently executing
+
+    def submit(self, item: Any) -> Any:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                busy = self._running > 0
+            if len(batch) > 1 or busy:
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+            # The batch runs on the pool so the next one can be collected meanwhile
+            with self._lock:
+                self._running += 1
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            self._dispatch(batch)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        if len(batch) > 1:
+            logger.info("%s: processing batch of %s items", self.name, len(batch))
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{self.name}: expected {len(batch)} results, got {len(results)}")
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block and receive the same result (or exception).
+    Nothing is remembered once the call completes — that is the cache's job.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import os
 import re
 import html
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 from dateutil import parser as dateparser
 from dateutil.relativedelta import relativedelta
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 
-from openrouter_api import OpenRouterAPI
+from openrouter_api import OpenRouterAPI, DEFAULT_MODEL
 from sefaria_api import SefariaAPI
 from hebcal_api import HebcalAPI
+from cache_utils import DiskCache
+from semantic_cache import SimilarQueryIndex, normalize_query
+from env_utils import load_env
+from batching import MicroBatcher
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +29,8 @@ DATE_RE = re.compile(r"(\d{4})[- /.](\d{1,2})[- /.](\d{1,2})")  # Полный 
 DATE_WITHOUT_YEAR_RE = re.compile(r"(?<!\d)(\d{1,2})\s*(?:[-./]|\s+)?\s*([а-яА-Яa-zA-Z]+)")  # Формат без года: 15 мая, 12 декабря, 29 октября
 # Регулярное выражение для формата "DD месяц YYYY"
 DATE_WITH_YEAR_TEXT_RE = re.compile(r"(?<!\d)(\d{1,2})\s*(?:[-./]|\s+)?\s*([а-яА-Яa-zA-Z]+)\s*(?:[-./]|\s+)?\s*(\d{4})")  # Формат с годом: 15 мая 2023, 12 декабря 1948
+# Слова запроса (используется для поиска названий еврейских месяцев)
+WORD_RE = re.compile(r"\b[a-zA-Zа-яА-Я']+\b")
 
 # Словарь с названиями еврейских месяцев
 HEBREW_MONTH_MAP = {
@@ -94,13 +103,187 @@ MONTH_NAME_TO_NUMBER = {
     "december": 12, "dec": 12
 }
 
+# Справка о еврейском календаре, добавляемая к результатам конвертации дат
+JEWISH_CALENDAR_NOTE = (
+    "\n\n<b>О еврейском календаре:</b>\n"
+    "Еврейский календарь основан на лунно-солнечном цикле. "
+    "Год состоит из 12 или 13 месяцев, в зависимости от високосности. "
+    "День в еврейском календаре начинается с заходом солнца."
+)
+
+# Описание категорий маршрутизатора (одинаково для всех запросов, поэтому их можно объединять в пакеты)
+ROUTER_CATEGORIES_PROMPT = """
+Ты — маршрутизатор для еврейского чат-бота. Выбери одну из категорий, которая лучше всего описывает намерение пользователя.
+
+Категории:
+
+• calendar_today         — узнать сегодняшнюю/завтрашнюю/вчерашнюю дату, день недели, еврейскую дату и т.п.
+• calendar_info          — запрос даты или информации о празднике, шаббате, конвертация дат, сколько дней до события, (например: «19 июля какой день по еврейски», «2 кислев какой день по григориански», «5 сиван конвертируй в григорианский»)
+• calendar_diff          — разница между двумя датами
+• calendar_with_context  — требуется и календарная информация, и объяснение текста (например: «Расскажи о Шавуоте и когда он будет»)
+• text_search            — поиск источников, объяснение понятий, вопросов о законах, комментариях, историях и т.п.
+• general                — всё остальное, включая философию, мораль, историю, современность
+"""
+
+# Промпт маршрутизатора для одного запроса
+ROUTER_PROMPT = ROUTER_CATEGORIES_PROMPT + """
+Отвечай только одной категорией. Без пояснений. Без кавычек. Только имя категории.
+"""
+
+# Промпт маршрутизатора для пакета пронумерованных запросов разных пользователей
+ROUTER_BATCH_PROMPT = ROUTER_CATEGORIES_PROMPT + """
+Тебе пришлют несколько пронумерованных запросов разных пользователей. Для каждого запроса выбери категорию
+независимо от остальных и выведи ее на отдельной строке в виде «[номер] категория», например: [1] general.
+Номера и порядок сохраняй. Без пояснений. Без кавычек.
+"""
+
+# Категории, которые может вернуть маршрутизатор; любой другой ответ модели считается "general"
+ROUTER_CATEGORIES = frozenset({
+    "calendar_today", "calendar_info", "calendar_diff",
+    "calendar_with_context", "text_search", "general",
+})
+
+# Тривиальные сообщения получают готовый ответ без обращения к API
+GREETING_RE = re.compile(r"^\W*(привет\w*|здравствуй\w*|шалом|shalom|hi|hello)\W*$", re.I)
+THANKS_RE = re.compile(r"^\W*(спасибо\w*(\s+большое)?|благодарю|тода|thanks|thank you)\W*$", re.I)
+GREETING_REPLY = (
+    "<b>Шалом!</b> Задайте вопрос о еврейских текстах, традициях или календаре — "
+    "и я постараюсь ответить развёрнуто и с источниками."
+)
+THANKS_REPLY = "Пожалуйста! Если появятся новые вопросы — пишите."
+TOO_SHORT_REPLY = "Пожалуйста, сформулируйте вопрос подробнее."
+HELP_REPLY = "Просто задайте вопрос. Команды: /calendar — календарь на сегодня, /convert — конвертация даты."
+# Частые вопросы о самом боте (ключи нормализованы: нижний регистр, без пунктуации)
+FAQ_ANSWERS = {
+    "кто ты": "Я бот-помощник по еврейским текстам, традициям и календарю.",
+    "что ты умеешь": (
+        "Я отвечаю на вопросы о еврейских текстах и традициях, показываю еврейскую дату, "
+        "праздники и недельную главу, конвертирую даты между григорианским и еврейским календарями "
+        "(например: /convert 2025-05-06)."
+    ),
+    "помощь": HELP_REPLY,
+    "help": HELP_REPLY,
+}
+
+# Очевидные календарные запросы маршрутизируются без обращения к модели:
+# конвертация явно указанной даты
+QUICK_DATE_RE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[./]\d{1,2}[./]\d{4}|\d{1,2}\s+[а-яА-Яa-zA-Z]+")
+QUICK_CONVERSION_RE = re.compile(
+    r"конвертир|перевед|перевест|по[- ]?еврейски|по[- ]?григориански|в еврейск|в григорианск", re.I
+)
+
+# Системный промпт: статический префикс всех запросов к модели
+SYSTEM_PROMPT = """
+Ты — эксперт по иудаизму, еврейским текстам и традициям. Твоя задача — давать точные, информативные и уважительные ответы на вопросы о еврейской религии, культуре, истории и традициях.
+
+Правила:
+1. Отвечай на том языке на котором задан вопрос.
+2. Используй уважительный тон и избегай оценочных суждений.
+3. Если не знаешь ответа, честно признай это.
+4. Приводи источники и цитаты, когда это уместно.
+5. Объясняй сложные концепции простым языком.
+6. Не используй Markdown-форматирование. Запрещено использовать символы и конструкции, связанные с Markdown, включая: #, *, _, `, ~~, > и т.д.
+7. Используй ТОЛЬКО HTML-форматирование для структурирования ответа.
+8. СТРОГО соблюдай правила HTML: каждый открытый тег должен быть правильно закрыт тем же тегом.
+9. Разрешенные HTML теги: <b></b> (жирный), <i></i> (курсив), <u></u> (подчеркнутый), <blockquote></blockquote> (цитата).
+10. ЗАПРЕЩЕНО смешивать теги: если открыл <i>, закрывай </i>, а НЕ </u> или </b>.
+11. Проверяй каждый HTML тег перед отправкой ответа.
+12. Добавляй предупреждение в конце.
+
+ПРИМЕРЫ ПРАВИЛЬНОГО HTML:
+✅ <b>Правильно:</b> <i>курсив</i> и <u>подчеркнутый</u>
+✅ <b>Моисей (Моше рабейну)</b> — центральный пророк
+✅ <i>Неопалимая купина</i> — чудесный куст
+
+ПРИМЕРЫ НЕПРАВИЛЬНОГО HTML:
+❌ <i>текст</u> — НЕПРАВИЛЬНО! Открыт <i>, а закрыт </u>
+❌ <b>текст</i> — НЕПРАВИЛЬНО! Открыт <b>, а закрыт </i>
+❌ <u>текст</b> — НЕПРАВИЛЬНО! Открыт <u>, а закрыт </b>
+
+Формат ответа для вопросов не свзанных с датами, конвертацией и календарем:
+[Основной ответ]
+[Пояснения к терминам]
+[Источники и справки]
+
+Пример:
+Вопрос: "Что означает концепция тиккун олам?"
+Ответ: 
+"Тиккун олам (букв. 'исправление мира') — это концепция... [развёрнутое объяснение]
+
+Пояснения:
+- Тиккун олам: идея человеческого участия в совершенствовании мира
+- Цдука: еврейская концепция благотворительности
+
+Источники:
+- Упоминается в Мишне (Гитин 4:5)
+- Развита лурианской каббалой (Исаак Лурия, Цфат, XVI век)"
+
+
+Когда отвечаешь на вопросы о еврейских законах (галахе):
+- Указывай, что существуют разные мнения и традиции.
+- Отмечай различия между сефардской, ашкеназской и другими традициями, если они существенны.
+- Подчеркивай, что для практических решений следует консультироваться с раввином.
+
+Когда цитируешь тексты:
+- Указывай точный источник (книга, глава, стих).
+- По возможности приводи текст на иврите и его перевод.
+- Объясняй контекст цитаты.
+
+Когда отвечаешь на вопросы о календаре и датах:
+- Указывай даты по григорианскому и еврейскому календарям.
+- Объясняй особенности праздников и постов.
+- Указывай время начала и окончания Шаббата и праздников, если это уместно.
+
+<blockquote> Формулируйте запросы максимально чётко для получения полезной информации.</blockquote>
+<blockquote>⚠️ <b>Внимание:</b> Информация приведена для ознакомления. Для получения авторитетного мнения рекомендуется проконсультироваться с раввином.</blockquote>
+"""
+
+# Параметры пакетной маршрутизации одновременных запросов
+ROUTER_MAX_BATCH = 16
+ROUTER_MAX_WAIT_MS = 50
+
+# Дисковый кэш ответов модели на повторяющиеся вопросы (категории text_search и general)
+RESPONSE_CACHE_PATH = ".cache/chatbot/responses.sqlite3"  # переопределяется переменной RESPONSE_CACHE_PATH
+RESPONSE_CACHE_TTL = 7 * 86400  # секунд
+ERROR_RESPONSE_PREFIXES = ("Ошибка при", "Произошла ошибка")
+
 
 class SefariaChatBot:
     def __init__(self):
+        load_env()
         self.openrouter_api = OpenRouterAPI()
+        self.model = DEFAULT_MODEL
         self.sefaria_api = SefariaAPI()
         self.hebcal_api = HebcalAPI()
         self.system_prompt = self._build_system_prompt()
+        # Отпечаток системного промпта: по нему видно, что префикс запросов не меняется
+        self.system_prompt_hash = hashlib.sha256(self.system_prompt.encode("utf-8")).hexdigest()
+        logger.info(f"Системный промпт: sha256={self.system_prompt_hash[:12]}, {len(self.system_prompt)} символов")
+        # Одновременные запросы классифицируются одним обращением к модели
+        self._router_batcher = MicroBatcher(
+            self._route_batch,
+            max_batch=ROUTER_MAX_BATCH,
+            max_wait_ms=ROUTER_MAX_WAIT_MS,
+            name="router",
+        )
+        response_cache_path = os.getenv("RESPONSE_CACHE_PATH", RESPONSE_CACHE_PATH)
+        self._response_cache = DiskCache(response_cache_path, ttl=RESPONSE_CACHE_TTL)
+        # Вопросы из тех же слов (регистр, пунктуация, порядок слов) ведут к тем же ответам
+        self._similar_queries = SimilarQueryIndex(
+            response_cache_path,
+            namespace=f"{self.model}:{self.system_prompt_hash}",
+            ttl=RESPONSE_CACHE_TTL,
+        )
+    
+    def _response_cache_key(self, query: str) -> str:
+        """
+        Ключ кэша ответов: модель, системный промпт и нормализованный вопрос.
+        
+        Смена модели или промпта дает новые ключи, поэтому старые ответы не используются.
+        """
+        normalized = " ".join(query.lower().split())
+        raw = f"{self.model}\n{self.system_prompt_hash}\n{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
     
     def _validate_and_fix_html(self, text: str) -> str:
         """
@@ -188,77 +371,16 @@ class SefariaChatBot:
         Returns:
             str: Системный промпт
         """
-        return """
-Ты — эксперт по иудаизму, еврейским текстам и традициям. Твоя задача — давать точные, информативные и уважительные ответы на вопросы о еврейской религии, культуре, истории и традициях.
-
-Правила:
-1. Отвечай на том языке на котором задан вопрос.
-2. Используй уважительный тон и избегай оценочных суждений.
-3. Если не знаешь ответа, честно признай это.
-4. Приводи источники и цитаты, когда это уместно.
-5. Объясняй сложные концепции простым языком.
-6. Не используй Markdown-форматирование. Запрещено использовать символы и конструкции, связанные с Markdown, включая: #, *, _, `, ~~, > и т.д.
-7. Используй ТОЛЬКО HTML-форматирование для структурирования ответа.
-8. СТРОГО соблюдай правила HTML: каждый открытый тег должен быть правильно закрыт тем же тегом.
-9. Разрешенные HTML теги: <b></b> (жирный), <i></i> (курсив), <u></u> (подчеркнутый), <blockquote></blockquote> (цитата).
-10. ЗАПРЕЩЕНО смешивать теги: если открыл <i>, закрывай </i>, а НЕ </u> или </b>.
-11. Проверяй каждый HTML тег перед отправкой ответа.
-12. Добавляй предупреждение в конце.
-
-ПРИМЕРЫ ПРАВИЛЬНОГО HTML:
-✅ <b>Правильно:</b> <i>курсив</i> и <u>подчеркнутый</u>
-✅ <b>Моисей (Моше рабейну)</b> — центральный пророк
-✅ <i>Неопалимая купина</i> — чудесный куст
-
-ПРИМЕРЫ НЕПРАВИЛЬНОГО HTML:
-❌ <i>текст</u> — НЕПРАВИЛЬНО! Открыт <i>, а закрыт </u>
-❌ <b>текст</i> — НЕПРАВИЛЬНО! Открыт <b>, а закрыт </i>
-❌ <u>текст</b> — НЕПРАВИЛЬНО! Открыт <u>, а закрыт </b>
-
-Формат ответа для вопросов не свзанных с датами, конвертацией и календарем:
-[Основной ответ]
-[Пояснения к терминам]
-[Источники и справки]
-
-Пример:
-Вопрос: "Что означает концепция тиккун олам?"
-Ответ: 
-"Тиккун олам (букв. 'исправление мира') — это концепция... [развёрнутое объяснение]
-
-Пояснения:
-- Тиккун олам: идея человеческого участия в совершенствовании мира
-- Цдука: еврейская концепция благотворительности
-
-Источники:
-- Упоминается в Мишне (Гитин 4:5)
-- Развита лурианской каббалой (Исаак Лурия, Цфат, XVI век)"
-
-
-Когда отвечаешь на вопросы о еврейских законах (галахе):
-- Указывай, что существуют разные мнения и традиции.
-- Отмечай различия между сефардской, ашкеназской и другими традициями, если они существенны.
-- Подчеркивай, что для практических решений следует консультироваться с раввином.
+        return SYSTEM_PROMPT
 
-Когда цитируешь тексты:
-- Указывай точный источник (книга, глава, стих).
-- По возможности приводи текст на иврите и его перевод.
-- Объясняй контекст цитаты.
-
-Когда отвечаешь на вопросы о календаре и датах:
-- Указывай даты по григорианскому и еврейскому календарям.
-- Объясняй особенности праздников и постов.
-- Указывай время начала и окончания Шаббата и праздников, если это уместно.
-
-<blockquote> Формулируйте запросы максимально чётко для получения полезной информации.</blockquote>
-<blockquote>⚠️ <b>Внимание:</b> Информация приведена для ознакомления. Для получения авторитетного мнения рекомендуется проконсультироваться с раввином.</blockquote>
-"""
-
-    def handle_query(self, query: str) -> str:
+    def handle_query(self, query: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
         """
         Обрабатывает запрос пользователя и возвращает ответ.
         
         Args:
             query (str): Запрос пользователя
+            on_delta (Callable[[str], None], optional): Получает накопленный текст ответа
+                по мере потоковой генерации
             
         Returns:
             str: Ответ на запрос
@@ -267,6 +389,19 @@ class SefariaChatBot:
             # Логируем входящий запрос
             logger.info(f"Получен запрос: {query}")
             
+            trivial = self._answer_trivial(query)
+            if trivial:
+                logger.info("Тривиальный запрос, готовый ответ")
+                return trivial
+            
+            # Дословный повтор отвечаем из кэша без маршрутизации и обращения к модели:
+            # в кэше лежат только ответы категорий text_search и general
+            cache_key = self._response_cache_key(query)
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Ответ найден в кэше")
+                return cached
+            
             # Определяем категорию запроса
             category = self._route_query(query)
             logger.info(f"Определена категория запроса: {category}")
@@ -276,20 +411,28 @@ class SefariaChatBot:
                 return self._get_calendar_context(query)
             
             if category == "calendar_info":
-                return self._handle_calendar_event(query)
+                return self._handle_calendar_event(query, on_delta=on_delta)
             
             if category == "calendar_diff":
                 return self._handle_date_diff(query)
             
             if category == "calendar_with_context":
                 cal_ctx = self._get_calendar_context(query)
-                return self._process_query(query, custom_context=cal_ctx)
-            
-            if category == "text_search":
-                return self._process_query(query)
-            
-            # Если категория не определена, обрабатываем как обычный запрос
-            return self._process_query(query)
+                return self._process_query(query, custom_context=cal_ctx, on_delta=on_delta)
+            
+            # text_search и все остальное: ответ зависит только от вопроса, его можно кэшировать.
+            # Переформулированный вопрос ищется только здесь, после маршрутизации
+            similar_key = self._similar_queries.find(query)
+            cached = self._response_cache.get(similar_key) if similar_key else None
+            if cached is not None:
+                logger.info("Ответ на вопрос из тех же слов найден в кэше")
+                return cached
+            
+            response = self._process_query(query, on_delta=on_delta)
+            if not response.startswith(ERROR_RESPONSE_PREFIXES):
+                self._response_cache.set(cache_key, response)
+                self._similar_queries.add(query, cache_key)
+            return response
         except Exception as e:
             logger.error(f"Ошибка при обработке запроса: {e}", exc_info=True)
             return f"Произошла ошибка при обработке запроса: {str(e)}"
@@ -304,23 +447,17 @@ class SefariaChatBot:
         Returns:
             str: Категория запроса
         """
-        router_prompt = """
-Ты — маршрутизатор для еврейского чат-бота. Выбери одну из категорий, которая лучше всего описывает намерение пользователя.
-
-Категории:
-
-• calendar_today         — узнать сегодняшнюю/завтрашнюю/вчерашнюю дату, день недели, еврейскую дату и т.п.
-• calendar_info          — запрос даты или информации о празднике, шаббате, конвертация дат, сколько дней до события, (например: «19 июля какой день по еврейски», «2 кислев какой день по григориански», «5 сиван конвертируй в григорианский»)
-• calendar_diff          — разница между двумя датами
-• calendar_with_context  — требуется и календарная информация, и объяснение текста (например: «Расскажи о Шавуоте и когда он будет»)
-• text_search            — поиск источников, объяснение понятий, вопросов о законах, комментариях, историях и т.п.
-• general                — всё остальное, включая философию, мораль, историю, современность
-
-Отвечай только одной категорией. Без пояснений. Без кавычек. Только имя категории.
-"""
+        category = self._quick_route(query)
+        if category:
+            logger.info(f"Категория определена без модели: {category}")
+            return category
+        
         try:
             logger.info(f"Определение категории запроса: {query}")
-            category = self.openrouter_api.generate_response(prompt=query, context=router_prompt).strip().lower()
+            category = self._router_batcher.submit(query).strip().lower()
+            if category not in ROUTER_CATEGORIES:
+                logger.warning(f"Маршрутизатор вернул неизвестную категорию: {category[:100]!r}")
+                return "general"
             logger.info(f"Определена категория: {category}")
             return category
         except Exception as e:
@@ -328,6 +465,54 @@ class SefariaChatBot:
             # В случае ошибки возвращаем общую категорию
             return "general"
 
+    @staticmethod
+    def _answer_trivial(query: str) -> Optional[str]:
+        """
+        Возвращает готовый ответ на тривиальное сообщение.
+        
+        Args:
+            query (str): Запрос пользователя
+            
+        Returns:
+            Optional[str]: Ответ или None, если запрос нужно обрабатывать полностью
+        """
+        if len(query.strip()) < 2:
+            return TOO_SHORT_REPLY
+        if GREETING_RE.search(query):
+            return GREETING_REPLY
+        if THANKS_RE.search(query):
+            return THANKS_REPLY
+        return FAQ_ANSWERS.get(normalize_query(query))
+
+    @staticmethod
+    def _quick_route(query: str) -> Optional[str]:
+        """
+        Определяет категорию очевидных запросов регулярными выражениями.
+        
+        Args:
+            query (str): Запрос пользователя
+            
+        Returns:
+            Optional[str]: Категория или None, если нужен маршрутизатор-модель
+        """
+        if QUICK_DATE_RE.search(query) and QUICK_CONVERSION_RE.search(query):
+            return "calendar_info"
+        return None
+
+    def _route_batch(self, queries: List[str]) -> List[str]:
+        """
+        Определяет категории для пакета запросов одним обращением к модели.
+        
+        Args:
+            queries (List[str]): Запросы пользователей
+            
+        Returns:
+            List[str]: Категории в порядке запросов
+        """
+        return self.openrouter_api.generate_batch_response(
+            queries, context=ROUTER_PROMPT, batch_context=ROUTER_BATCH_PROMPT
+        )
+
     # Словарь с альтернативными названиями праздников на русском языке
     HOLIDAY_NAMES = {
         "песах": ["песах", "пейсах", "пасха", "песаха", "песаху", "песахе"],
@@ -344,12 +529,14 @@ class SefariaChatBot:
         "тиша бе-ав": ["тиша бе-ав", "тиша бе ав", "тиша беав", "9 ава"]
     }
 
-    def _handle_calendar_event(self, query: str) -> str:
+    def _handle_calendar_event(self, query: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
         """
         Обрабатывает запросы, связанные с календарными событиями.
         
         Args:
             query (str): Запрос пользователя
+            on_delta (Callable[[str], None], optional): Получает накопленный текст ответа
+                по мере потоковой генерации
             
         Returns:
             str: Ответ на запрос
@@ -379,7 +566,7 @@ class SefariaChatBot:
             # Если это запрос на конвертацию даты, вызываем специальный обработчик
             if is_date_conversion:
                 logger.info("Определен запрос на конвертацию даты")
-                return self._handle_date_conversion(query)
+                return self._handle_date_conversion(query, on_delta=on_delta)
             
             # Проверяем, является ли запрос запросом о времени до праздника
             is_days_until_query = any(phrase in query_lower for phrase in [
@@ -509,7 +696,7 @@ class SefariaChatBot:
                     logger.info(f"Найдена информация о празднике {holiday_name}")
                     
                     # Добавляем информацию о празднике из API
-                    return self._process_query(query, custom_context=self.system_prompt + factual_ctx)
+                    return self._process_query(query, custom_context=factual_ctx, on_delta=on_delta)
             
             # Если это не запрос о конкретном празднике или праздник не найден
             logger.info("Праздник не найден или запрос не о празднике, возвращаем календарный контекст")
@@ -518,12 +705,14 @@ class SefariaChatBot:
             logger.error(f"Ошибка при обработке календарного события: {e}", exc_info=True)
             return f"Произошла ошибка при обработке запроса о календарном событии: {str(e)}"
         
-    def _handle_date_conversion(self, query: str) -> str:
+    def _handle_date_conversion(self, query: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
         """
         Обрабатывает запросы на конвертацию дат между григорианским и еврейским календарями.
         
         Args:
             query (str): Запрос пользователя
+            on_delta (Callable[[str], None], optional): Получает накопленный текст ответа
+                по мере потоковой генерации
             
         Returns:
             str: Ответ на запрос с результатами конвертации
@@ -556,60 +745,17 @@ class SefariaChatBot:
             # Извлекаем григорианскую дату из запроса
             if to_hebrew:
                 # Сначала проверяем полный формат даты (YYYY-MM-DD)
-                date_match = DATE_RE.search(query)
+                date_match = DATE_RE.search(query_lower)
                 if date_match:
                     y, m, d = map(int, date_match.groups())
                     try:
                         greg_date = date(y, m, d)
-                        hebrew_data = self.hebcal_api.convert_date_to_hebrew(greg_date)
-                        
-                        if "error" in hebrew_data:
-                            return f"<b>Ошибка конвертации:</b>\n{hebrew_data.get('error', 'Неизвестная ошибка')}"
-                        
-                        # Получаем дополнительную информацию о дате
-                        weekday_ru = WEEKDAY_RU.get(greg_date.strftime("%A"), greg_date.strftime("%A"))
-                        
-                        # Получаем информацию о праздниках на эту дату
-                        holidays = self.hebcal_api.get_holidays(date=greg_date.strftime("%Y-%m-%d"))
-                        holiday_lines = []
-                        for h in holidays.get("items", []) or []:
-                            title = h.get("title", "")
-                            desc = h.get("description", "")
-                            line = f"• {title}"
-                            if desc:
-                                line += f": {desc}"
-                            holiday_lines.append(line)
-                        
-                        # Формируем контекст с результатами конвертации и дополнительной информацией
-                        factual_block = (
-                            f"<b>Результат конвертации даты:</b>\n\n"
-                            f"Григорианская дата <b>{greg_date.strftime('%d.%m.%Y')}</b> ({weekday_ru}) "
-                            f"соответствует еврейской дате <b>{hebrew_data.get('hebrew', '')}</b>.\n\n"
-                            f"<b>Подробная информация:</b>\n"
-                            f"• Еврейский год: {hebrew_data.get('hy', '')}\n"
-                            f"• Еврейский месяц: {hebrew_data.get('hm', '')}\n"
-                            f"• Еврейский день: {hebrew_data.get('hd', '')}\n"
-                        )
-                        
-                        if holiday_lines:
-                            factual_block += f"\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
-                        else:
-                            factual_block += "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
-                        
-                        # Добавляем информацию о еврейском календаре
-                        factual_block += (
-                            f"\n\n<b>О еврейском календаре:</b>\n"
-                            f"Еврейский календарь основан на лунно-солнечном цикле. "
-                            f"Год состоит из 12 или 13 месяцев, в зависимости от високосности. "
-                            f"День в еврейском календаре начинается с заходом солнца."
-                        )
-                        
-                        return self._process_query(query, custom_context=self.system_prompt + "\n\n" + factual_block)
+                        return self._respond_with_hebrew_date(query, greg_date, on_delta=on_delta)
                     except ValueError as e:
                         logger.error(f"Ошибка при создании даты: {e}")
                 
                 # Сначала ищем формат "DD месяц YYYY" (например, "15 июля 1948")
-                date_with_year_text_match = DATE_WITH_YEAR_TEXT_RE.search(query)
+                date_with_year_text_match = DATE_WITH_YEAR_TEXT_RE.search(query_lower)
                 if date_with_year_text_match:
                     day, month_name, year = date_with_year_text_match.groups()
                     day = int(day)
@@ -618,7 +764,7 @@ class SefariaChatBot:
                     # Определяем номер месяца по его названию
                     month_number = None
                     for month_key, month_num in MONTH_NAME_TO_NUMBER.items():
-                        if month_key in month_name.lower():
+                        if month_key in month_name:
                             month_number = month_num
                             break
                     
@@ -627,55 +773,12 @@ class SefariaChatBot:
                         logger.info(f"Распознана дата с годом: {day} {month_name} {year}")
                         try:
                             greg_date = date(year, month_number, day)
-                            hebrew_data = self.hebcal_api.convert_date_to_hebrew(greg_date)
-                            
-                            if "error" in hebrew_data:
-                                return f"<b>Ошибка конвертации:</b>\n{hebrew_data.get('error', 'Неизвестная ошибка')}"
-                            
-                            # Получаем дополнительную информацию о дате
-                            weekday_ru = WEEKDAY_RU.get(greg_date.strftime("%A"), greg_date.strftime("%A"))
-                            
-                            # Получаем информацию о праздниках на эту дату
-                            holidays = self.hebcal_api.get_holidays(date=greg_date.strftime("%Y-%m-%d"))
-                            holiday_lines = []
-                            for h in holidays.get("items", []) or []:
-                                title = h.get("title", "")
-                                desc = h.get("description", "")
-                                line = f"• {title}"
-                                if desc:
-                                    line += f": {desc}"
-                                holiday_lines.append(line)
-                            
-                            # Формируем контекст с результатами конвертации и дополнительной информацией
-                            factual_block = (
-                                f"<b>Результат конвертации даты:</b>\n\n"
-                                f"Григорианская дата <b>{greg_date.strftime('%d.%m.%Y')}</b> ({weekday_ru}) "
-                                f"соответствует еврейской дате <b>{hebrew_data.get('hebrew', '')}</b>.\n\n"
-                                f"<b>Подробная информация:</b>\n"
-                                f"• Еврейский год: {hebrew_data.get('hy', '')}\n"
-                                f"• Еврейский месяц: {hebrew_data.get('hm', '')}\n"
-                                f"• Еврейский день: {hebrew_data.get('hd', '')}\n"
-                            )
-                            
-                            if holiday_lines:
-                                factual_block += f"\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
-                            else:
-                                factual_block += "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
-                            
-                            # Добавляем информацию о еврейском календаре
-                            factual_block += (
-                                f"\n\n<b>О еврейском календаре:</b>\n"
-                                f"Еврейский календарь основан на лунно-солнечном цикле. "
-                                f"Год состоит из 12 или 13 месяцев, в зависимости от високосности. "
-                                f"День в еврейском календаре начинается с заходом солнца."
-                            )
-                            
-                            return self._process_query(query, custom_context=self.system_prompt + "\n\n" + factual_block)
+                            return self._respond_with_hebrew_date(query, greg_date, on_delta=on_delta)
                         except ValueError as e:
                             logger.error(f"Ошибка при создании даты с годом: {e}")
                 
                 # Если формат с годом не найден, ищем дату без года (например, "15 июля")
-                date_without_year_match = DATE_WITHOUT_YEAR_RE.search(query)
+                date_without_year_match = DATE_WITHOUT_YEAR_RE.search(query_lower)
                 if date_without_year_match:
                     day, month_name = date_without_year_match.groups()
                     day = int(day)
@@ -683,13 +786,13 @@ class SefariaChatBot:
                     # Определяем номер месяца по его названию
                     month_number = None
                     for month_key, month_num in MONTH_NAME_TO_NUMBER.items():
-                        if month_key in month_name.lower():
+                        if month_key in month_name:
                             month_number = month_num
                             break
                     
                     if month_number:
                         # Проверяем, есть ли год в запросе
-                        year_match = re.search(r"(\d{4})", query)
+                        year_match = re.search(r"(\d{4})", query_lower)
                         if year_match:
                             # Используем найденный год
                             year = int(year_match.group(1))
@@ -700,50 +803,7 @@ class SefariaChatBot:
                             logger.info(f"Год не найден в запросе, используем текущий: {year}")
                         try:
                             greg_date = date(year, month_number, day)
-                            hebrew_data = self.hebcal_api.convert_date_to_hebrew(greg_date)
-                            
-                            if "error" in hebrew_data:
-                                return f"<b>Ошибка конвертации:</b>\n{hebrew_data.get('error', 'Неизвестная ошибка')}"
-                            
-                            # Получаем дополнительную информацию о дате
-                            weekday_ru = WEEKDAY_RU.get(greg_date.strftime("%A"), greg_date.strftime("%A"))
-                            
-                            # Получаем информацию о праздниках на эту дату
-                            holidays = self.hebcal_api.get_holidays(date=greg_date.strftime("%Y-%m-%d"))
-                            holiday_lines = []
-                            for h in holidays.get("items", []) or []:
-                                title = h.get("title", "")
-                                desc = h.get("description", "")
-                                line = f"• {title}"
-                                if desc:
-                                    line += f": {desc}"
-                                holiday_lines.append(line)
-                            
-                            # Формируем контекст с результатами конвертации и дополнительной информацией
-                            factual_block = (
-                                f"<b>Результат конвертации даты:</b>\n\n"
-                                f"Григорианская дата <b>{greg_date.strftime('%d.%m.%Y')}</b> ({weekday_ru}) "
-                                f"соответствует еврейской дате <b>{hebrew_data.get('hebrew', '')}</b>.\n\n"
-                                f"<b>Подробная информация:</b>\n"
-                                f"• Еврейский год: {hebrew_data.get('hy', '')}\n"
-                                f"• Еврейский месяц: {hebrew_data.get('hm', '')}\n"
-                                f"• Еврейский день: {hebrew_data.get('hd', '')}\n"
-                            )
-                            
-                            if holiday_lines:
-                                factual_block += f"\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
-                            else:
-                                factual_block += "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
-                            
-                            # Добавляем информацию о еврейском календаре
-                            factual_block += (
-                                f"\n\n<b>О еврейском календаре:</b>\n"
-                                f"Еврейский календарь основан на лунно-солнечном цикле. "
-                                f"Год состоит из 12 или 13 месяцев, в зависимости от високосности. "
-                                f"День в еврейском календаре начинается с заходом солнца."
-                            )
-                            
-                            return self._process_query(query, custom_context=self.system_prompt + "\n\n" + factual_block)
+                            return self._respond_with_hebrew_date(query, greg_date, on_delta=on_delta)
                         except ValueError as e:
                             logger.error(f"Ошибка при создании даты без года: {e}")
             
@@ -759,19 +819,18 @@ class SefariaChatBot:
                 
                 # Если месяц не найден, ищем по словарю HEBREW_MONTH_NORMALIZE
                 if not month:
-                    # Ищем все слова в запросе, которые могут быть названиями месяцев
-                    words = re.findall(r'\b[a-zA-Zа-яА-Я\']+\b', query_lower)
-                    for word in words:
-                        normalized_month = HEBREW_MONTH_NORMALIZE.get(word.lower())
+                    # Ищем среди слов запроса те, которые могут быть названиями месяцев
+                    for word in WORD_RE.findall(query_lower):
+                        normalized_month = HEBREW_MONTH_NORMALIZE.get(word)
                         if normalized_month:
                             month = normalized_month
                             break
                 
                 # Ищем день месяца (1-30)
-                day_match = re.search(r"(?<!\d)(\d{1,2})(?!\d)", query)
+                day_match = re.search(r"(?<!\d)(\d{1,2})(?!\d)", query_lower)
                 
                 # Пытаемся найти еврейский год (4-5 цифр)
-                year_match = re.search(r"(\d{4,5})", query)
+                year_match = re.search(r"(\d{4,5})", query_lower)
                 hebrew_year = int(year_match.group(1)) if year_match else None
                 
                 # Если год не указан, используем текущий еврейский год
@@ -797,21 +856,24 @@ class SefariaChatBot:
                         if "error" in greg_data:
                             return f"<b>Ошибка конвертации:</b>\n{greg_data.get('error', 'Неизвестная ошибка')}"
                         
+                        # Извлекаем поля ответа один раз
+                        try:
+                            gy = greg_data["gy"]
+                            gm = greg_data["gm"]
+                            gd = greg_data["gd"]
+                        except KeyError as e:
+                            logger.error(f"Неполный ответ Hebcal при конвертации: отсутствует поле {e}")
+                            return f"<b>Ошибка конвертации:</b>\nНеполный ответ календарного сервиса (нет поля {e})."
+                        
                         # Создаем объект даты для получения дня недели
                         try:
-                            greg_date = date(int(greg_data.get('gy', '')), int(greg_data.get('gm', '')), int(greg_data.get('gd', '')))
-                            weekday_ru = WEEKDAY_RU.get(greg_date.strftime("%A"), greg_date.strftime("%A"))
+                            greg_date = date(int(gy), int(gm), int(gd))
+                            weekday = greg_date.strftime("%A")
+                            weekday_ru = WEEKDAY_RU.get(weekday, weekday)
                             
                             # Получаем информацию о праздниках на эту дату
                             holidays = self.hebcal_api.get_holidays(date=greg_date.strftime("%Y-%m-%d"))
-                            holiday_lines = []
-                            for h in holidays.get("items", []) or []:
-                                title = h.get("title", "")
-                                desc = h.get("description", "")
-                                line = f"• {title}"
-                                if desc:
-                                    line += f": {desc}"
-                                holiday_lines.append(line)
+                            holiday_lines = self._format_holiday_lines(holidays)
                             
                             # Формируем контекст с результатами конвертации и дополнительной информацией
                             factual_block = (
@@ -819,36 +881,23 @@ class SefariaChatBot:
                                 f"Еврейская дата <b>{hebrew_day} {month} {hebrew_year}</b> "
                                 f"соответствует григорианской дате <b>{greg_date.strftime('%d.%m.%Y')}</b> ({weekday_ru}).\n\n"
                                 f"<b>Подробная информация:</b>\n"
-                                f"• Григорианский год: {greg_data.get('gy', '')}\n"
-                                f"• Григорианский месяц: {greg_data.get('gm', '')}\n"
-                                f"• Григорианский день: {greg_data.get('gd', '')}\n"
+                                f"• Григорианский год: {gy}\n"
+                                f"• Григорианский месяц: {gm}\n"
+                                f"• Григорианский день: {gd}\n"
                                 f"• День недели: {weekday_ru}\n"
                             )
+                            factual_block += self._format_holidays_section(holiday_lines) + JEWISH_CALENDAR_NOTE
                             
-                            if holiday_lines:
-                                factual_block += f"\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
-                            else:
-                                factual_block += "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
-                            
-                            # Добавляем информацию о еврейском календаре
-                            factual_block += (
-                                f"\n\n<b>О еврейском календаре:</b>\n"
-                                f"Еврейский календарь основан на лунно-солнечном цикле. "
-                                f"Год состоит из 12 или 13 месяцев, в зависимости от високосности. "
-                                f"День в еврейском календаре начинается с заходом солнца."
-                            )
-                            
-                            return self._process_query(query, custom_context=self.system_prompt + "\n\n" + factual_block)
+                            return self._process_query(query, custom_context=factual_block, on_delta=on_delta)
                         except (ValueError, TypeError) as e:
                             logger.error(f"Ошибка при создании объекта даты: {e}")
                             # Если не удалось создать объект даты, возвращаем простой ответ
-                            greg_date_str = f"{greg_data.get('gd', '')}.{greg_data.get('gm', '')}.{greg_data.get('gy', '')}"
                             factual_block = (
                                 f"<b>Результат конвертации даты:</b>\n\n"
                                 f"Еврейская дата <b>{hebrew_day} {month} {hebrew_year}</b> "
-                                f"соответствует григорианской дате <b>{greg_date_str}</b>."
+                                f"соответствует григорианской дате <b>{gd}.{gm}.{gy}</b>."
                             )
-                            return self._process_query(query, custom_context=self.system_prompt + "\n\n" + factual_block)
+                            return self._process_query(query, custom_context=factual_block, on_delta=on_delta)
                     except (ValueError, KeyError) as e:
                         logger.error(f"Ошибка при конвертации еврейской даты: {e}")
             
@@ -858,6 +907,93 @@ class SefariaChatBot:
             logger.error(f"Ошибка при конвертации даты: {e}", exc_info=True)
             return f"Произошла ошибка при конвертации даты: {str(e)}"
             
+    def _respond_with_hebrew_date(self, query: str, greg_date: date,
+                                  on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Конвертирует григорианскую дату в еврейскую и формирует ответ модели.
+        
+        Args:
+            query (str): Запрос пользователя
+            greg_date (date): Григорианская дата
+            on_delta (Callable[[str], None], optional): Получает накопленный текст ответа
+                по мере потоковой генерации
+            
+        Returns:
+            str: Ответ на запрос с результатами конвертации
+        """
+        hebrew_data = self.hebcal_api.convert_date_to_hebrew(greg_date)
+        
+        if "error" in hebrew_data:
+            return f"<b>Ошибка конвертации:</b>\n{hebrew_data.get('error', 'Неизвестная ошибка')}"
+        
+        # Извлекаем поля ответа один раз
+        try:
+            hebrew = hebrew_data["hebrew"]
+            hy = hebrew_data["hy"]
+            hm = hebrew_data["hm"]
+            hd = hebrew_data["hd"]
+        except KeyError as e:
+            logger.error(f"Неполный ответ Hebcal при конвертации: отсутствует поле {e}")
+            return f"<b>Ошибка конвертации:</b>\nНеполный ответ календарного сервиса (нет поля {e})."
+        
+        # Получаем дополнительную информацию о дате
+        weekday = greg_date.strftime("%A")
+        weekday_ru = WEEKDAY_RU.get(weekday, weekday)
+        
+        # Получаем информацию о праздниках на эту дату
+        holidays = self.hebcal_api.get_holidays(date=greg_date.strftime("%Y-%m-%d"))
+        holiday_lines = self._format_holiday_lines(holidays)
+        
+        # Формируем контекст с результатами конвертации и дополнительной информацией
+        factual_block = (
+            f"<b>Результат конвертации даты:</b>\n\n"
+            f"Григорианская дата <b>{greg_date.strftime('%d.%m.%Y')}</b> ({weekday_ru}) "
+            f"соответствует еврейской дате <b>{hebrew}</b>.\n\n"
+            f"<b>Подробная информация:</b>\n"
+            f"• Еврейский год: {hy}\n"
+            f"• Еврейский месяц: {hm}\n"
+            f"• Еврейский день: {hd}\n"
+        )
+        factual_block += self._format_holidays_section(holiday_lines) + JEWISH_CALENDAR_NOTE
+        
+        return self._process_query(query, custom_context=factual_block, on_delta=on_delta)
+    
+    @staticmethod
+    def _format_holiday_lines(holidays: Dict[str, Any]) -> List[str]:
+        """
+        Форматирует праздники из ответа Hebcal в строки списка.
+        
+        Args:
+            holidays (Dict[str, Any]): Ответ Hebcal с ключом items
+            
+        Returns:
+            List[str]: Строки вида "• Название: описание"
+        """
+        holiday_lines = []
+        for h in holidays.get("items") or []:
+            try:
+                title = h["title"]
+            except KeyError:
+                continue
+            desc = h.get("description")
+            holiday_lines.append(f"• {title}: {desc}" if desc else f"• {title}")
+        return holiday_lines
+    
+    @staticmethod
+    def _format_holidays_section(holiday_lines: List[str]) -> str:
+        """
+        Формирует раздел о праздниках для фактического блока.
+        
+        Args:
+            holiday_lines (List[str]): Строки с праздниками
+            
+        Returns:
+            str: Раздел о праздниках
+        """
+        if holiday_lines:
+            return "\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
+        return "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
+            
     def _handle_date_diff(self, query: str) -> str:
         """
         Обрабатывает запросы о разнице между двумя датами.
@@ -1069,8 +1205,15 @@ class SefariaChatBot:
                 # Используем конкретную дату из запроса
                 target_date = specific_date
             
-            # Получаем еврейскую дату
-            hebrew_data = self.hebcal_api.convert_date_to_hebrew(target_date)
+            # Еврейская дата, праздники и недельная глава не зависят друг от друга:
+            # запросы к Hebcal выполняются параллельно, а не по очереди
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                hebrew_future = executor.submit(self.hebcal_api.convert_date_to_hebrew, target_date)
+                holidays_future = executor.submit(
+                    self.hebcal_api.get_holidays, date=target_date.strftime("%Y-%m-%d")
+                )
+                parashat_future = executor.submit(self.hebcal_api.get_parashat_hashavua)
+            hebrew_data = hebrew_future.result()
             
             if "error" in hebrew_data:
                 return f"<b>Ошибка при получении еврейской даты:</b>\n{hebrew_data.get('error', 'Неизвестная ошибка')}"
@@ -1078,19 +1221,11 @@ class SefariaChatBot:
             # Получаем день недели
             weekday_ru = WEEKDAY_RU.get(target_date.strftime("%A"), target_date.strftime("%A"))
             
-            # Получаем информацию о праздниках на эту дату
-            holidays = self.hebcal_api.get_holidays(date=target_date.strftime("%Y-%m-%d"))
-            holiday_lines = []
-            for h in holidays.get("items", []) or []:
-                title = h.get("title", "")
-                desc = h.get("description", "")
-                line = f"• {title}"
-                if desc:
-                    line += f": {desc}"
-                holiday_lines.append(line)
-            
-            # Получаем информацию о недельной главе Торы
-            parashat = self.hebcal_api.get_parashat_hashavua()
+            # Информация о праздниках на эту дату
+            holiday_lines = self._format_holiday_lines(holidays_future.result())
+            
+            # Информация о недельной главе Торы
+            parashat = parashat_future.result()
             parashat_info = ""
             if "error" not in parashat:
                 parashat_title = parashat.get("title", "")
@@ -1138,10 +1273,7 @@ class SefariaChatBot:
                 f"• Еврейский день: {hebrew_data.get('hd', '')}\n"
             )
             
-            if holiday_lines:
-                calendar_context += f"\n<b>Ближайшие праздники и события на эту дату:</b>\n" + "\n".join(holiday_lines)
-            else:
-                calendar_context += "\n<b>Праздники и события:</b> На эту дату не приходится особых праздников или событий."
+            calendar_context += self._format_holidays_section(holiday_lines)
             
             calendar_context += parashat_info
             
@@ -1150,23 +1282,42 @@ class SefariaChatBot:
             logger.error(f"Ошибка при получении календарного контекста: {e}", exc_info=True)
             return f"Произошла ошибка при получении календарной информации: {str(e)}"
     
-    def _process_query(self, query: str, custom_context: str = None) -> str:
+    def _process_query(self, query: str, custom_context: str = None,
+                       on_delta: Optional[Callable[[str], None]] = None) -> str:
         """
         Обрабатывает запрос пользователя с помощью модели OpenRouter.
         
         Args:
             query (str): Запрос пользователя
-            custom_context (str, optional): Пользовательский контекст для модели
+            custom_context (str, optional): Дополнительный контекст (факты из календаря и т.п.),
+                передается модели вместе с системным промптом
+            on_delta (Callable[[str], None], optional): Получает накопленный текст ответа
+                по мере потоковой генерации
             
         Returns:
             str: Ответ на запрос
         """
         try:
-            # Используем пользовательский контекст, если он предоставлен
-            context = custom_context if custom_context else self.system_prompt
-            
-            # Генерируем ответ с помощью модели
-            response = self.openrouter_api.generate_response(prompt=query, context=context)
+            # Системный промпт идет отдельным статическим префиксом (кэшируется провайдером),
+            # пользовательский контекст — после него
+            if on_delta:
+                # Потоковая генерация: передаем накопленный текст по мере поступления
+                response = ""
+                for delta in self.openrouter_api.generate_response_stream(
+                    prompt=query,
+                    context=custom_context,
+                    system_prompt=self.system_prompt,
+                ):
+                    response += delta
+                    on_delta(response)
+                # При обрыве потока generate_response_stream бросает исключение: вместо
+                # частичного ответа возвращается сообщение об ошибке, и оно не кэшируется
+            else:
+                response = self.openrouter_api.generate_response(
+                    prompt=query,
+                    context=custom_context,
+                    system_prompt=self.system_prompt,
+                )
             
             # Валидируем и исправляем HTML теги в ответе
             validated_response = self._validate_and_fix_html(response)
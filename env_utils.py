@@ -0,0 +1,14 @@
+"""
+Environment loading shared by the entry points and API clients.
+"""
+from __future__ import annotations
+
+import functools
+
+from dotenv import load_dotenv
+
+
+@functools.lru_cache(maxsize=1)
+def load_env() -> None:
+    """Read ``.env`` into ``os.environ`` once per process; later calls are free."""
+    load_dotenv()
@@ -2,17 +2,51 @@ from __future__ import annotations
 
 import datetime as _dt
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List
 from urllib.parse import urlencode
 
+import orjson
 import requests
 
+from cache_utils import TTLCache
+from http_utils import make_session
+
 # ----------------------------------------------------------------------------
 # Logging
 # ----------------------------------------------------------------------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ----------------------------------------------------------------------------
+# HTTP session: one keep-alive connection pool shared by all instances, so
+# consecutive Hebcal calls reuse the TCP/TLS connection instead of reopening it
+# ----------------------------------------------------------------------------
+_SESSION = make_session()
+
+
+# Словарь для нормализации названий еврейских месяцев (ключи в нижнем регистре)
+_HEBREW_MONTH_BASE = {
+    # Основные варианты
+    "nisan": "Nisan", "iyyar": "Iyyar", "sivan": "Sivan",
+    "tamuz": "Tamuz", "tammuz": "Tamuz", "av": "Av", "elul": "Elul",
+    "tishrei": "Tishrei", "tishri": "Tishrei", "cheshvan": "Cheshvan",
+    "heshvan": "Cheshvan", "kislev": "Kislev", "tevet": "Tevet",
+    "shvat": "Shvat", "adar": "Adar",
+    "adar i": "Adar I", "adar 1": "Adar I", "adar ii": "Adar II", "adar 2": "Adar II",
+
+    # Варианты с апострофом
+    "sh'vat": "Shvat", "adar i'": "Adar I", "adar ii'": "Adar II",
+}
+
+# Те же ключи во всех распространенных регистрах, чтобы нормализация обходилась
+# одним поиском в словаре без lower()/capitalize()
+HEBREW_MONTH_NORMALIZE = {
+    variant: normalized
+    for key, normalized in _HEBREW_MONTH_BASE.items()
+    for variant in {key, key.capitalize(), key.title(), key.upper(), normalized}
+}
+
 
 class HebcalAPI:
     """Helper for Hebcal endpoints (converter, holidays, shabbat, …)."""
@@ -22,6 +56,24 @@ class HebcalAPI:
     shabbat_url = "https://www.hebcal.com/shabbat"
     yahrzeit_url = "https://www.hebcal.com/yahrzeit"
 
+    HEBREW_MONTH_NORMALIZE = HEBREW_MONTH_NORMALIZE
+
+    # Max parallel converter requests when converting a list of dates
+    max_conversion_workers = 16
+
+    # Longest span of consecutive days Hebcal converts in one range request
+    max_range_days = 180
+
+    # Seconds a failed calendar bundle is kept, so an outage is not hit on every query
+    calendar_error_ttl = 60
+
+    # Process-wide caches shared by all instances (keys include the language).
+    # Date conversion is deterministic, so converter answers never expire;
+    # holiday calendars are refreshed daily.
+    _conversion_cache = TTLCache(maxsize=4096)
+    _year_holidays_cache = TTLCache(maxsize=512, ttl=86400)
+    _calendar_bundle_cache = TTLCache(maxsize=64, ttl=3600)
+
     def __init__(self, lang: str = "ru") -> None:
         # Common parameters added to every request
         self.default_params: Dict[str, Any] = {
@@ -37,7 +89,7 @@ class HebcalAPI:
         if isinstance(gregorian_date, _dt.date):
             gregorian_date = gregorian_date.strftime("%Y-%m-%d")
         try:
-            gy, gm, gd = gregorian_date.split("-")
+            gy, gm, gd = (int(part) for part in gregorian_date.split("-"))
         except ValueError:
             return {"error": "Неверный формат даты. Используйте YYYY-MM-DD."}
 
@@ -48,40 +100,69 @@ class HebcalAPI:
             "gd": gd,
             "g2h": 1,  # <-- crucial flag!
         }
-        result = self._get_json(self.converter_url, params)
-        
-        return result
+        return self._get_converter_json(("g2h", gy, gm, gd), params)
 
-    # Словарь для нормализации названий еврейских месяцев
-    HEBREW_MONTH_NORMALIZE = {
-        # Основные варианты
-        "nisan": "Nisan", "iyyar": "Iyyar", "sivan": "Sivan", 
-        "tamuz": "Tamuz", "tammuz": "Tamuz", "av": "Av", "elul": "Elul",
-        "tishrei": "Tishrei", "tishri": "Tishrei", "cheshvan": "Cheshvan", 
-        "heshvan": "Cheshvan", "kislev": "Kislev", "tevet": "Tevet", 
-        "shvat": "Shvat", "sh'vat": "Shvat", "adar": "Adar", 
-        "adar i": "Adar I", "adar 1": "Adar I", "adar ii": "Adar II", "adar 2": "Adar II",
-        
-        # Варианты с апострофом
-        "sh'vat": "Shvat", "adar i'": "Adar I", "adar ii'": "Adar II",
-    }
+    def convert_dates_to_hebrew(self, dates: "List[_dt.date | str]") -> List[Dict[str, Any]]:
+        """Gregorian → Hebrew for many dates; results follow the order of ``dates``.
+
+        Dates that fit in one window of ``max_range_days`` are converted by a
+        single range request (``start``/``end``), and every day of the range is
+        cached; a date with no neighbours falls back to a single-date request.
+        Windows are fetched in parallel. Range answers carry only the date
+        fields (no ``heDateParts``/``afterSunset``), so they are cached under
+        their own key and never returned by ``convert_date_to_hebrew``.
+        """
+        lang = self.default_params["lg"]
+        results: Dict[_dt.date, Dict[str, Any]] = {}
+        pending: List[_dt.date] = []
+        for value in dates:
+            try:
+                day = self._as_date(value)
+            except ValueError:
+                continue
+            cached = self._conversion_cache.get(("g2h", day.year, day.month, day.day, lang))
+            if cached is None:
+                cached = self._conversion_cache.get(("g2h-range", day.year, day.month, day.day, lang))
+            if cached is not None:
+                results[day] = cached
+            elif day not in pending:
+                pending.append(day)
+
+        windows: List[List[_dt.date]] = []
+        for day in sorted(pending):
+            if windows and (day - windows[-1][0]).days < self.max_range_days:
+                windows[-1].append(day)
+            else:
+                windows.append([day])
+        if windows:
+            workers = min(self.max_conversion_workers, len(windows))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for converted in executor.map(self._convert_window, windows):
+                    results.update(converted)
 
-    def normalize_hebrew_month(self, month: str) -> str:
+        invalid = {"error": "Неверный формат даты. Используйте YYYY-MM-DD."}
+        converted_dates = []
+        for value in dates:
+            try:
+                converted_dates.append(results[self._as_date(value)])
+            except ValueError:
+                converted_dates.append(invalid)
+        return converted_dates
+
+    @classmethod
+    def normalize_hebrew_month(cls, month: str) -> str:
         """Нормализует название еврейского месяца к стандартному формату."""
         if not month:
             return ""
         
-        # Приводим к нижнему регистру для поиска в словаре
-        month_lower = month.lower()
-        
-        # Проверяем, есть ли месяц в словаре нормализации
-        normalized = self.HEBREW_MONTH_NORMALIZE.get(month_lower)
+        # Обычные варианты написания уже есть в словаре — одна проверка без копий строки
+        normalized = cls.HEBREW_MONTH_NORMALIZE.get(month)
         if normalized:
             return normalized
         
-        # Если месяц не найден в словаре, возвращаем исходное значение
+        # Редкий смешанный регистр; если месяц не найден, возвращаем исходное значение
         # с первой буквой в верхнем регистре
-        return month.capitalize()
+        return cls.HEBREW_MONTH_NORMALIZE.get(month.lower()) or month.capitalize()
 
     def convert_date_to_gregorian(self, hebrew_date: "dict | str") -> Dict[str, Any]:
         """Hebrew → Gregorian. Accepts dict {'hy','hm','hd'} or '5786 Nisan 15'."""
@@ -135,43 +216,37 @@ class HebcalAPI:
                 
             return {"error": f"Отсутствуют обязательные параметры: {', '.join(missing_params)}"}
 
-        # Получаем результат от API
-        result = self._get_json(self.converter_url, params)
-        
-        return result
+        # Получаем результат от API (или из кэша)
+        key = ("h2g", str(params["hy"]), params["hm"], str(params["hd"]))
+        return self._get_converter_json(key, params)
 
     # ---------------------------------------------------------------------
     # Holidays
     # ---------------------------------------------------------------------
     def get_holidays(self, date: "_dt.date | str | None" = None, *, start_date: "_dt.date | str | None" = None,
                      end_date: "_dt.date | str | None" = None, include_minor: bool = True) -> Dict[str, Any]:
-        """Return holidays on a single date or in a range."""
-        params = {
-            **self.default_params,
-            "v": 1,
-            "maj": "on",
-        }
-        if include_minor:
-            params["min"] = "on"
+        """Return holidays on a single date or in a range.
 
+        Served from the cached year calendars (see get_holidays_for_year) and
+        filtered locally, so repeated lookups do not hit Hebcal.
+        """
         if date:
-            if isinstance(date, _dt.date):
-                date = date.strftime("%Y-%m-%d")
-            y, m, d = date.split("-")
-            params.update({"year": y, "month": m, "day": d})
-        elif start_date and end_date:
-            if isinstance(start_date, _dt.date):
-                start_date = start_date.strftime("%Y-%m-%d")
-            if isinstance(end_date, _dt.date):
-                end_date = end_date.strftime("%Y-%m-%d")
-            params.update({"start": start_date, "end": end_date})
-        else:
-            params["year"] = _dt.date.today().year
-
-        return self._get_json(self.base_url, params)
+            # Hebcal answers a year/month/day query with the whole month
+            day = self._as_date(date)
+            start = day.replace(day=1)
+            end = (start + _dt.timedelta(days=32)).replace(day=1) - _dt.timedelta(days=1)
+            return self._holidays_between(start, end, include_minor)
+        if start_date and end_date:
+            return self._holidays_between(self._as_date(start_date), self._as_date(end_date), include_minor)
+        return self.get_holidays_for_year(_dt.date.today().year, include_minor)
 
     def get_holidays_for_year(self, year: int | None = None, include_minor: bool = True) -> Dict[str, Any]:
-        year = year or _dt.date.today().year
+        year = int(year or _dt.date.today().year)
+        key = (year, include_minor, self.default_params["lg"])
+        cached = self._year_holidays_cache.get(key)
+        if cached is not None:
+            return cached
+
         params = {
             **self.default_params,
             "v": 1,
@@ -180,7 +255,10 @@ class HebcalAPI:
         }
         if include_minor:
             params["min"] = "on"
-        return self._get_json(self.base_url, params)
+        result = self._get_json(self.base_url, params)
+        if "error" not in result:
+            self._year_holidays_cache.set(key, result)
+        return result
 
     # ---------------------------------------------------------------------
     # Shabbat & Yahrzeit (unchanged minor tweaks)
@@ -255,15 +333,18 @@ class HebcalAPI:
         if not items:
             return "Праздники не найдены"
         
+        # Праздники идут плотно, поэтому все даты конвертируются парой запросов по диапазонам
+        dates = list(dict.fromkeys(item["date"] for item in items if item.get("date")))
+        hebrew_by_date: Dict[str, str] = {
+            date_str: hebrew_date.get("hebrew", "")
+            for date_str, hebrew_date in zip(dates, self.convert_dates_to_hebrew(dates))
+        }
+        
         formatted_holidays = []
         for item in items:
             title = item.get("title", "")
             date_str = item.get("date", "")
-            hebrew = ""
-            
-            if date_str:
-                hebrew_date = self.convert_date_to_hebrew(date_str)
-                hebrew = hebrew_date.get("hebrew", "")
+            hebrew = hebrew_by_date.get(date_str, "")
             
             line = f"• {title} — {date_str}"
             if hebrew:
@@ -285,120 +366,145 @@ class HebcalAPI:
         today = _dt.date.today()
         return self.convert_date_to_hebrew(today)
     
-    def get_parashat_hashavua(self) -> Dict[str, Any]:
-        """Получает текущую недельную главу Торы (парашат ха-шавуа)."""
-        # Получаем текущую дату и ближайшие 7 дней
+    def get_calendar_bundle(self, days: int = 21) -> Dict[str, Any]:
+        """
+        Ближайшие недельная глава и даф йоми одним запросом.
+
+        Даф йоми приходит на каждый день диапазона, поэтому диапазон короткий:
+        трех недель хватает, чтобы найти главу даже после праздников, когда
+        чтение главы в шаббат пропускается.
+        Результат кэшируется на час, ответ с ошибкой — на ``calendar_error_ttl`` секунд.
+        """
         today = _dt.date.today()
-        end_date = today + _dt.timedelta(days=7)
-        
-        # Параметры для запроса парашат ха-шавуа
+        key = (today, days, self.default_params["lg"])
+        cached = self._calendar_bundle_cache.get(key)
+        if cached is not None:
+            return cached
+
         params = {
             **self.default_params,
             "v": 1,
             "start": today.strftime("%Y-%m-%d"),
-            "end": end_date.strftime("%Y-%m-%d"),
-            "category": "parashat",
+            "end": (today + _dt.timedelta(days=days)).strftime("%Y-%m-%d"),
+            "s": "on",  # недельные главы
+            "F": "on",  # даф йоми
         }
-        
-        try:
-            response = self._get_json(self.base_url, params)
-            items = response.get("items", [])
-            
-            # Ищем первый элемент с категорией parashat
-            for item in items:
-                if item.get("category") == "parashat":
-                    return {
-                        "title": item.get("title", ""),
-                        "hebrew": item.get("hebrew", ""),
-                        "date": item.get("date", "")
-                    }
-            
-            # Если не нашли, возвращаем пустой результат
-            return {"error": "Парашат ха-шавуа не найдена", "title": "", "hebrew": "", "date": ""}
-        except Exception as e:
-            logger.error("Ошибка при получении парашат ха-шавуа: %s", e)
-            return {"error": str(e), "title": "", "hebrew": "", "date": ""}
+        response = self._get_json(self.base_url, params)
+
+        bundle: Dict[str, Any] = {"parashat": None, "dafyomi": None}
+        for item in response.get("items", []):
+            category = item.get("category")
+            if category in bundle and bundle[category] is None:
+                # Элементы идут по возрастанию даты: первый и есть ближайший
+                bundle[category] = {
+                    "title": item.get("title", ""),
+                    "hebrew": item.get("hebrew", ""),
+                    "date": item.get("date", ""),
+                }
+
+        if "error" in response:
+            bundle["error"] = response["error"]
+            self._calendar_bundle_cache.set(key, bundle, ttl=self.calendar_error_ttl)
+        else:
+            self._calendar_bundle_cache.set(key, bundle)
+        return bundle
+
+    def get_parashat_hashavua(self) -> Dict[str, Any]:
+        """Получает текущую недельную главу Торы (парашат ха-шавуа)."""
+        bundle = self.get_calendar_bundle()
+        if bundle["parashat"]:
+            return dict(bundle["parashat"])
+        error = bundle.get("error", "Парашат ха-шавуа не найдена")
+        return {"error": error, "title": "", "hebrew": "", "date": ""}
     
     def get_daf_yomi(self) -> Dict[str, Any]:
         """Получает текущий лист Талмуда (даф йоми)."""
-        # Получаем текущую дату
-        today = _dt.date.today()
-        
-        # Параметры для запроса даф йоми
-        params = {
-            **self.default_params,
-            "v": 1,
-            "start": today.strftime("%Y-%m-%d"),
-            "end": today.strftime("%Y-%m-%d"),
-            "category": "dafyomi",
-        }
-        
-        try:
-            response = self._get_json(self.base_url, params)
-            items = response.get("items", [])
-            
-            # Ищем элемент с категорией dafyomi
-            for item in items:
-                if item.get("category") == "dafyomi":
-                    return {
-                        "title": item.get("title", ""),
-                        "hebrew": item.get("hebrew", ""),
-                        "date": item.get("date", "")
-                    }
-            
-            # Если не нашли, возвращаем пустой результат
-            return {"error": "Даф йоми не найден", "title": "", "hebrew": "", "date": ""}
-        except Exception as e:
-            logger.error("Ошибка при получении даф йоми: %s", e)
-            return {"error": str(e), "title": "", "hebrew": "", "date": ""}
+        bundle = self.get_calendar_bundle()
+        if bundle["dafyomi"]:
+            return dict(bundle["dafyomi"])
+        error = bundle.get("error", "Даф йоми не найден")
+        return {"error": error, "title": "", "hebrew": "", "date": ""}
     
     def get_upcoming_holidays(self, limit: int = 5) -> List[Dict[str, Any]]:
-        """Получает ближайшие праздники."""
-        # Получаем текущую дату и дату через 180 дней
+        """Получает ближайшие праздники (в пределах 180 дней, с переходом через границу года)."""
         today = _dt.date.today()
-        end_date = today + _dt.timedelta(days=180)
-        
-        # Параметры для запроса праздников
+        holidays = self._holidays_between(today, today + _dt.timedelta(days=180), include_minor=False)
+        return [
+            {"title": item.get("title", ""), "hebrew": item.get("hebrew", ""), "date": item.get("date", "")}
+            for item in holidays.get("items", [])
+            if item.get("category") == "holiday"
+        ][:limit]
+
+    # ---------------------------------------------------------------------
+    # Internal helpers
+    # ---------------------------------------------------------------------
+    @staticmethod
+    def _as_date(value: "_dt.date | str") -> _dt.date:
+        """Accepts a date, 'YYYY-MM-DD' (month and day may be unpadded) or a full
+        ISO timestamp as Hebcal gives for timed events; raises ValueError otherwise."""
+        if isinstance(value, _dt.datetime):
+            return value.date()
+        if isinstance(value, _dt.date):
+            return value
+        if "T" in value:
+            return _dt.datetime.fromisoformat(value).date()
+        return _dt.datetime.strptime(value, "%Y-%m-%d").date()
+
+    def _holidays_between(self, start: _dt.date, end: _dt.date, include_minor: bool) -> Dict[str, Any]:
+        """Items dated start..end (inclusive), taken from the cached year calendars."""
+        start_iso, end_iso = start.isoformat(), end.isoformat()
+        result: Dict[str, Any] = {}
+        items: List[Dict[str, Any]] = []
+        for year in range(start.year, end.year + 1):
+            payload = self.get_holidays_for_year(year, include_minor)
+            if "error" in payload:
+                return payload
+            result = result or payload
+            items.extend(item for item in payload.get("items", []) if start_iso <= item.get("date", "")[:10] <= end_iso)
+        return {**result, "items": items}
+
+    def _convert_window(self, days: List[_dt.date]) -> Dict[_dt.date, Dict[str, Any]]:
+        """Convert sorted dates spanning less than max_range_days with one request."""
+        if len(days) == 1:
+            return {days[0]: self.convert_date_to_hebrew(days[0])}
+
         params = {
             **self.default_params,
-            "v": 1,
-            "start": today.strftime("%Y-%m-%d"),
-            "end": end_date.strftime("%Y-%m-%d"),
-            "category": "holiday",
-            "maj": "on",
+            "g2h": 1,
+            "start": days[0].isoformat(),
+            "end": days[-1].isoformat(),
         }
-        
-        try:
-            response = self._get_json(self.base_url, params)
-            items = response.get("items", [])
-            
-            # Фильтруем только праздники
-            holidays = []
-            for item in items:
-                if item.get("category") == "holiday":
-                    holidays.append({
-                        "title": item.get("title", ""),
-                        "hebrew": item.get("hebrew", ""),
-                        "date": item.get("date", "")
-                    })
-                    
-                    # Ограничиваем количество праздников
-                    if len(holidays) >= limit:
-                        break
-            
-            return holidays
-        except Exception as e:
-            logger.error("Ошибка при получении праздников: %s", e)
-            return []
+        response = self._get_json(self.converter_url, params)
+        if "error" in response:
+            return {day: response for day in days}
+
+        lang = self.default_params["lg"]
+        converted: Dict[_dt.date, Dict[str, Any]] = {}
+        for iso, entry in response.get("hdates", {}).items():
+            day = _dt.date.fromisoformat(iso)
+            # Date fields of a single-date answer; the full answer keeps its own cache key
+            entry = {"gy": day.year, "gm": day.month, "gd": day.day, **entry}
+            self._conversion_cache.set(("g2h-range", day.year, day.month, day.day, lang), entry)
+            converted[day] = entry
+        missing = {"error": "Дата отсутствует в ответе Hebcal"}
+        return {day: converted.get(day, missing) for day in days}
+
+    def _get_converter_json(self, key: tuple, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Converter request memoized on the normalized date (errors are not cached)."""
+        key = (*key, self.default_params["lg"])
+        cached = self._conversion_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._get_json(self.converter_url, params)
+        if "error" not in result:
+            self._conversion_cache.set(key, result)
+        return result
 
-    # ---------------------------------------------------------------------
-    # Internal HTTP helper
-    # ---------------------------------------------------------------------
     def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = _SESSION.get(url, params=params, timeout=10)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except requests.exceptions.RequestException as exc:
             logger.error("Hebcal API error (%s): %s", url, exc)
             return {"error": str(exc), "items": []}
@@ -0,0 +1,90 @@
+"""
+On-disk cache of GET answers for the API test scripts.
+
+Development runs of ``test_api.py`` and ``test_date_conversion.py`` with
+``--cache`` repeat the same requests every time; the scripts mount
+``CachingAdapter`` on the sessions they test. Production sessions built by
+``http_utils.make_session`` never cache.
+"""
+from __future__ import annotations
+
+import functools
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter
+
+from cache_utils import DiskCache
+
+TEST_HTTP_CACHE_PATH = ".cache/tests/http.sqlite3"
+
+# Default lifetime of a cached answer
+HTTP_CACHE_TTL = 86400
+
+# Date conversion is deterministic, so converter answers are cached for good;
+# Shabbat times for an hour
+HEBCAL_CACHE_TTLS: Dict[str, Optional[float]] = {
+    "https://www.hebcal.com/converter": None,
+    "https://www.hebcal.com/shabbat": 3600,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _disk_cache(path: str) -> DiskCache:
+    """One DiskCache per file, shared by every session that uses it."""
+    return DiskCache(path, ttl=HTTP_CACHE_TTL)
+
+
+class CachingAdapter(BaseAdapter):
+    """Adapter that answers repeated GET requests from a ``DiskCache``.
+
+    Wraps the session's own adapter, so its pool and retry settings stay in
+    effect. The key is the full request URL, query string included. Only
+    successful non-streamed answers are stored. ``ttls`` maps URL prefixes to
+    their own lifetime (``None`` = never expires); other URLs use the cache
+    default.
+    """
+
+    def __init__(self, adapter: BaseAdapter, cache: DiskCache,
+                 ttls: Optional[Dict[str, Optional[float]]] = None) -> None:
+        super().__init__()
+        self.adapter = adapter
+        self.cache = cache
+        self.ttls = ttls or {}
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, **kwargs: Any) -> requests.Response:
+        if request.method != "GET" or stream:
+            return self.adapter.send(request, stream=stream, **kwargs)
+
+        body = self.cache.get(request.url)
+        if body is not None:
+            response = requests.Response()
+            response.status_code = 200
+            response.reason = "OK"
+            response.url = request.url
+            response.request = request
+            response.encoding = "utf-8"
+            response._content = body.encode("utf-8")
+            return response
+
+        response = self.adapter.send(request, stream=stream, **kwargs)
+        if response.status_code == 200:
+            try:
+                body = response.content.decode("utf-8")
+            except UnicodeDecodeError:
+                return response
+            ttl = next((ttl for prefix, ttl in self.ttls.items() if request.url.startswith(prefix)),
+                       self.cache.ttl)
+            self.cache.set(request.url, body, ttl=ttl)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+def mount_disk_cache(session: requests.Session, path: str = TEST_HTTP_CACHE_PATH,
+                     ttls: Optional[Dict[str, Optional[float]]] = None) -> None:
+    """Cache the GET answers of ``session`` in ``path``; calling it again is a no-op."""
+    adapter = session.get_adapter("https://")
+    if not isinstance(adapter, CachingAdapter):
+        session.mount("https://", CachingAdapter(adapter, _disk_cache(path), ttls))
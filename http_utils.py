@@ -0,0 +1,55 @@
+"""
+Pooled HTTP sessions shared by the API clients.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transient answers worth repeating: rate limiting and upstream failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# One pooled connection per bot worker thread (main.DEFAULT_WORKER_THREADS):
+# a smaller pool makes concurrent requests open throwaway connections
+DEFAULT_POOL_MAXSIZE = 32
+
+
+class _SafeRetry(Retry):
+    """``Retry`` that never repeats a POST after a read error.
+
+    The server already has such a request and may still be working on it:
+    repeating a slow completion multiplies both the wait and the token spend.
+    GET requests and POST connection errors and ``RETRY_STATUSES`` answers
+    are retried as usual.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if method == "POST" and error is not None and self._is_read_error(error):
+            raise error
+        return super().increment(method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+
+
+def make_session(*, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, retries: int = 2, backoff_factor: float = 0.3,
+                 headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """Build a keep-alive ``requests.Session`` with a sized pool and retries.
+
+    Connection errors and ``RETRY_STATUSES`` are retried for GET and POST
+    alike (urllib3 skips POST by default), honouring ``Retry-After``; read
+    timeouts are retried for GET only (see ``_SafeRetry``). Timeouts are per
+    call: pass ``timeout=`` to every request.
+    """
+    retry = _SafeRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry))
+    return session
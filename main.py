@@ -1,10 +1,15 @@
 import os
+import re
+import html
 import time
+import random
 import logging
 import asyncio
-from dotenv import load_dotenv
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from telegram import Update, Message
-from telegram.error import TimedOut, NetworkError
+from telegram.error import NetworkError, BadRequest, RetryAfter, TelegramError
 from telegram.ext import (
     ApplicationBuilder,
     MessageHandler,
@@ -17,6 +22,7 @@ from telegram.ext import (
 )
 
 from chatbot import SefariaChatBot
+from env_utils import load_env
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Logging
@@ -33,24 +39,196 @@ logging.getLogger("telegram.ext").setLevel(logging.WARNING)
 
 
 # ────────────────────────────────────────────────────────────────────────────────
-# Helper: safe reply with retry & exponential back-off
+# Helper: safe reply with retry & jittered exponential back-off
 # ────────────────────────────────────────────────────────────────────────────────
-async def safe_reply(message: Message, text: str, parse_mode: str = "HTML", retries: int = 3):
-    delay = 1
-    for attempt in range(retries):
+SEND_RETRY_BASE = 0.5       # seconds, first back-off window
+SEND_RETRY_CAP = 8          # seconds, largest back-off window
+SEND_RETRY_DEADLINE = 30    # seconds, total time budget for one message
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+async def _with_retry(send, action: str, deadline: float = SEND_RETRY_DEADLINE):
+    """Вызывает send() до успеха или истечения deadline; None, если так и не удалось."""
+    give_up_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
         try:
-            return await message.reply_text(text, parse_mode=parse_mode)
-        except TimedOut:
-            logger.warning("TimedOut while sending message. Attempt %s/%s", attempt + 1, retries)
-            if attempt == retries - 1:
-                return None
-            await asyncio.sleep(delay)
-            delay *= 2
+            return await send()
+        except BadRequest:
+            # 4xx: повтор не поможет, решает вызывающий код (например, plain text)
+            raise
+        except RetryAfter as e:
+            delay = _retry_after_seconds(e)
+            reason = "RetryAfter"
+        except NetworkError as e:  # includes TimedOut
+            # Full jitter: клиенты не повторяют запросы синхронно после сбоя Telegram
+            delay = random.uniform(0, min(SEND_RETRY_CAP, SEND_RETRY_BASE * 2 ** attempt))
+            reason = type(e).__name__
+        attempt += 1
+        if time.monotonic() + delay > give_up_at:
+            logger.warning("%s while %s message, giving up after %s attempts", reason, action, attempt)
+            return None
+        logger.warning("%s while %s message. Attempt %s, retrying in %.1fs", reason, action, attempt, delay)
+        await asyncio.sleep(delay)
+
+
+async def safe_reply(message: Message, text: str, parse_mode: str = "HTML", deadline: float = SEND_RETRY_DEADLINE):
+    return await _with_retry(lambda: message.reply_text(text, parse_mode=parse_mode), "sending", deadline)
+
+
+async def safe_edit(message: Message, text: str, parse_mode: str = "HTML", deadline: float = SEND_RETRY_DEADLINE):
+    return await _with_retry(lambda: message.edit_text(text, parse_mode=parse_mode), "editing", deadline)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: send one part of a long answer, falling back to plain text
+# ────────────────────────────────────────────────────────────────────────────────
+MESSAGE_CHUNK_SIZE = 4000  # Telegram limit is 4096 characters per message
+
+# Up to MESSAGE_CHUNK_SIZE characters ending right before whitespace, so words and
+# simple tags like <b> are not cut in half; hard cut if there is no whitespace at all
+CHUNK_RE = re.compile(rf".{{1,{MESSAGE_CHUNK_SIZE}}}(?=\s|$)|.{{1,{MESSAGE_CHUNK_SIZE}}}", re.S)
+
+
+def split_message(text: str) -> list[str]:
+    return [part for part in (m.group().strip() for m in CHUNK_RE.finditer(text)) if part]
+
+
+async def send_part(message: Message, part: str):
+    try:
+        return await safe_reply(message, part, parse_mode="HTML")
+    except Exception as e:
+        # Логируем подробную информацию об ошибке HTML
+        if "Can't parse entities" in str(e) or "unmatched end tag" in str(e):
+            logger.warning(f"Ошибка при отправке HTML-сообщения: {e}. Повтор с plain text.")
+            # Удаляем все HTML теги для безопасной отправки
+            clean_part = re.sub(r'<[^>]+>', '', part)
+            return await safe_reply(message, clean_part, parse_mode=None)
+        logger.warning(f"Ошибка при отправке сообщения: {e}. Повтор с plain text.")
+        return await safe_reply(message, part, parse_mode=None)
+
+
+async def edit_part(message: Message, part: str) -> Optional[Message]:
+    """Заменяет текст сообщения; None, если отредактировать не удалось."""
+    try:
+        return await safe_edit(message, part, parse_mode="HTML")
+    except BadRequest as e:
+        if "not modified" in str(e):
+            return message
+        logger.warning(f"Ошибка при редактировании HTML-сообщения: {e}. Повтор с plain text.")
+    try:
+        return await safe_edit(message, re.sub(r'<[^>]+>', '', part), parse_mode=None)
+    except BadRequest as e:
+        if "not modified" in str(e):
+            return message
+        logger.warning(f"Не удалось отредактировать сообщение: {e}")
+        return None
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: live preview of a streamed answer (one message, edited in place)
+# ────────────────────────────────────────────────────────────────────────────────
+STREAM_EDIT_INTERVAL = 1.0  # seconds between edits: Telegram allows about one message per second per chat
+STREAM_PLACEHOLDER = "…"
+
+
+class StreamingReply:
+    """
+    Показывает ответ модели по мере генерации, редактируя одно сообщение.
+    
+    start() сразу отправляет заглушку, чтобы пользователь видел, что запрос принят.
+    push() вызывается из рабочего потока с накопленным текстом; run() в цикле
+    событий отправляет не чаще раза в STREAM_EDIT_INTERVAL самый свежий текст.
+    Промежуточный текст показывается без разметки: незакрытые HTML-теги
+    Telegram не принимает. Ошибки Telegram при показе промежуточного текста
+    только пропускают обновление (после RetryAfter — на указанное время).
+    """
+    def __init__(self, message: Message):
+        self.message = message
+        self.preview: Optional[Message] = None
+        self._loop = asyncio.get_running_loop()
+        self._latest = ""
+        self._shown = ""
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._paused_until = 0.0  # monotonic time, until which edits are skipped after RetryAfter
+
+    async def start(self):
+        try:
+            self.preview = await self.message.reply_text(STREAM_PLACEHOLDER, parse_mode=None)
+            self._shown = STREAM_PLACEHOLDER
+        except RetryAfter as e:
+            self._pause(e)
+            logger.warning(f"Не удалось отправить заглушку ответа: {e}")
+        except TelegramError as e:
+            # Без заглушки ответ будет отправлен обычным сообщением
+            logger.warning(f"Не удалось отправить заглушку ответа: {e}")
+
+    def push(self, text: str):
+        self._loop.call_soon_threadsafe(self._update, text)
+
+    def _update(self, text: str):
+        self._latest = text
+        self._changed.set()
+
+    def close(self):
+        self._closed.set()
+        self._changed.set()
+
+    async def run(self):
+        while not self._closed.is_set():
+            await self._changed.wait()
+            self._changed.clear()
+            if self._closed.is_set():
+                break
+            await self._show(self._latest)
+            interval = max(STREAM_EDIT_INTERVAL, self._paused_until - time.monotonic())
+            try:
+                await asyncio.wait_for(self._closed.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pause(self, error: RetryAfter):
+        self._paused_until = time.monotonic() + _retry_after_seconds(error)
+
+    async def _show(self, text: str):
+        # Отбрасываем недописанный тег в конце и всю разметку
+        plain = re.sub(r'<[^>]+>', '', re.sub(r'<[^>]*$', '', text))
+        plain = html.unescape(plain)[:MESSAGE_CHUNK_SIZE].strip()
+        if not plain or plain == self._shown or time.monotonic() < self._paused_until:
+            return
+        try:
+            if self.preview is None:
+                self.preview = await self.message.reply_text(plain, parse_mode=None)
+            else:
+                await self.preview.edit_text(plain, parse_mode=None)
+            self._shown = plain
+        except BadRequest as e:
+            if "not modified" not in str(e):
+                logger.warning(f"Не удалось обновить промежуточный ответ: {e}")
+        except RetryAfter as e:
+            self._pause(e)
+            logger.warning(f"Telegram ограничил частоту правок, пауза {_retry_after_seconds(e):.0f} с")
+        except TelegramError as e:
+            logger.warning(f"Не удалось обновить промежуточный ответ: {e}")
 
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Bot class (inherits logic from SefariaChatBot)
 # ────────────────────────────────────────────────────────────────────────────────
+TELEGRAM_PROMPT_RULES = """
+
+Дополнительные правила для Telegram-бота:
+1. Ответы должны быть хорошо структурированы для мобильного интерфейса.
+2. Используй HTML-форматирование для выделения важной информации.
+3. Разбивай длинные ответы на логические блоки с заголовками.
+"""
+
+
 class TelegramSefariaChatBot(SefariaChatBot):
     """
     Телеграм-бот для работы с еврейскими текстами и календарем.
@@ -66,13 +244,7 @@ class TelegramSefariaChatBot(SefariaChatBot):
         Returns:
             str: Системный промпт для телеграм-бота
         """
-        return super()._build_system_prompt() + """
-
-Дополнительные правила для Telegram-бота:
-1. Ответы должны быть хорошо структурированы для мобильного интерфейса.
-2. Используй HTML-форматирование для выделения важной информации.
-3. Разбивай длинные ответы на логические блоки с заголовками.
-"""
+        return super()._build_system_prompt() + TELEGRAM_PROMPT_RULES
     
     def get_calendar_context(self, query: str) -> str:
         """
@@ -88,15 +260,12 @@ class TelegramSefariaChatBot(SefariaChatBot):
 
 
 # ────────────────────────────────────────────────────────────────────────────────
-# Load env & token
+# Bot instance (created on first use)
 # ────────────────────────────────────────────────────────────────────────────────
-load_dotenv()
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-if not TELEGRAM_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN не найден в .env файле")
-
-
-chat_bot = TelegramSefariaChatBot()
+@functools.cache
+def get_bot() -> TelegramSefariaChatBot:
+    # Бот создается в main(), а не при импорте: импорт модуля не ходит к внешним API
+    return TelegramSefariaChatBot()
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -118,26 +287,34 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not user_input:
             return
 
-        response = chat_bot.handle_query(user_input)
+        # Запрос выполняется в отдельном потоке, чтобы цикл событий мог
+        # параллельно показывать ответ по мере генерации
+        streamer = StreamingReply(update.message)
+        await streamer.start()
+        consumer = asyncio.create_task(streamer.run())
+        try:
+            response = await asyncio.to_thread(get_bot().handle_query, user_input, streamer.push)
+        finally:
+            streamer.close()
+            try:
+                await consumer
+            except Exception as e:
+                # Сбой промежуточного показа не должен отменять готовый ответ
+                logger.warning(f"Ошибка при показе промежуточного ответа: {e}")
 
         if not response or not isinstance(response, str):
             response = "⚠️ Произошла ошибка при обработке запроса. Попробуйте позже."
 
-        for i in range(0, len(response), 4000):
-            part = response[i:i + 4000]
-            try:
-                await safe_reply(update.message, part, parse_mode="HTML")
-            except Exception as e:
-                # Логируем подробную информацию об ошибке HTML
-                if "Can't parse entities" in str(e) or "unmatched end tag" in str(e):
-                    logger.warning(f"Ошибка при отправке HTML-сообщения: {e}. Повтор с plain text.")
-                    # Удаляем все HTML теги для безопасной отправки
-                    import re
-                    clean_part = re.sub(r'<[^>]+>', '', part)
-                    await safe_reply(update.message, clean_part, parse_mode=None)
-                else:
-                    logger.warning(f"Ошибка при отправке сообщения: {e}. Повтор с plain text.")
-                    await safe_reply(update.message, part, parse_mode=None)
+        # Части отправляются по порядку: параллельные sendMessage Telegram может доставить
+        # в другом порядке; задержку снижает keep-alive соединение по HTTP/2
+        parts = split_message(response) or [response]
+        if streamer.preview is not None:
+            # Заглушка или промежуточный текст заменяется первой частью итогового ответа с разметкой;
+            # если отредактировать не удалось, первая часть уходит новым сообщением
+            if await edit_part(streamer.preview, parts[0]) is not None:
+                parts = parts[1:]
+        for part in parts:
+            await send_part(update.message, part)
 
     except Exception as e:
         logger.exception(f"Ошибка в handle_message: {e}")
@@ -145,7 +322,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def calendar_command(update: Update, context: CallbackContext):
-    response = chat_bot.get_calendar_context("сегодня")
+    # Синхронные запросы к Hebcal выполняются в потоке, не блокируя цикл событий
+    response = await asyncio.to_thread(get_bot().get_calendar_context, "сегодня")
     await safe_reply(update.message, response)
 
 
@@ -159,7 +337,7 @@ async def convert_command(update: Update, context: CallbackContext):
         return
 
     query = f"конвертировать дату {' '.join(args)}"
-    response = chat_bot.handle_query(query)
+    response = await asyncio.to_thread(get_bot().handle_query, query)
     await safe_reply(update.message, response)
 
 
@@ -170,14 +348,51 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logger.error("Exception while handling update %s: %s", update, context.error, exc_info=context.error)
 
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Event loop: uvloop when available (faster socket I/O), stock asyncio otherwise
+# ────────────────────────────────────────────────────────────────────────────────
+def _install_uvloop():
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Используется uvloop")
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Worker threads for blocking bot calls (asyncio.to_thread uses the default executor)
+# ────────────────────────────────────────────────────────────────────────────────
+DEFAULT_WORKER_THREADS = 32
+
+
+async def _post_init(app: Application):
+    workers = int(os.getenv("BOT_WORKER_THREADS", DEFAULT_WORKER_THREADS))
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-worker")
+    )
+    logger.info("Пул рабочих потоков: %s", workers)
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Main entry point (single-run, no relooping)
 # ────────────────────────────────────────────────────────────────────────────────
 def main():
+    load_env()
+    telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not telegram_token:
+        raise ValueError("TELEGRAM_BOT_TOKEN не найден в .env файле")
+    # Бот создается сразу: ошибка конфигурации (например, нет OPENROUTER_API_KEY)
+    # останавливает запуск, а не всплывает на первом сообщении пользователя
+    get_bot()
+
     app: Application = (
         ApplicationBuilder()
-        .token(TELEGRAM_TOKEN)
+        .token(telegram_token)
         .defaults(Defaults(parse_mode="HTML"))
+        .http_version("2")  # мультиплексирование запросов к Bot API в одном соединении
+        .concurrent_updates(True)  # обновления разных пользователей обрабатываются параллельно
+        .post_init(_post_init)
         .build()
     )
 
@@ -187,8 +402,23 @@ def main():
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_error_handler(error_handler)
 
-    logger.info("Бот запущен. Нажмите Ctrl+C для остановки.")
-    app.run_polling()
+    _install_uvloop()
+
+    webhook_url = os.getenv("TELEGRAM_WEBHOOK_URL")
+    if webhook_url:
+        # Webhook: Telegram сам доставляет обновления, без циклов getUpdates
+        port = int(os.getenv("PORT", "9999"))
+        logger.info("Бот запущен в режиме webhook на порту %s. Нажмите Ctrl+C для остановки.", port)
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=port,
+            url_path=telegram_token,
+            webhook_url=f"{webhook_url.rstrip('/')}/{telegram_token}",
+            secret_token=os.getenv("TELEGRAM_WEBHOOK_SECRET"),
+        )
+    else:
+        logger.info("Бот запущен. Нажмите Ctrl+C для остановки.")
+        app.run_polling()
 
 
 if __name__ == "__main__":
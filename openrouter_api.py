@@ -1,12 +1,53 @@
 import os
+import re
+import hashlib
+import functools
+import logging
+import orjson
 import requests
-from dotenv import load_dotenv
 
-# Загрузка переменных окружения из .env файла
-load_dotenv()
+from batching import SingleFlight
+from cache_utils import TTLCache
+from env_utils import load_env
+from http_utils import make_session
+
+logger = logging.getLogger(__name__)
+
+# Модель по умолчанию для всех запросов
+DEFAULT_MODEL = "openai/gpt-5-mini"
+
+# Таймауты (подключение, чтение) в секундах; генерация длинного ответа может идти долго
+REQUEST_TIMEOUT = (5, 60)
+
+# Провайдеры, которые кэшируют префикс промпта только по явной метке cache_control
+# (OpenAI и DeepSeek кэшируют длинные префиксы автоматически)
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/")
+
+# Кэш точных совпадений запросов: не больше стольких ответов в памяти
+RESPONSE_CACHE_MAX = 512
+
+# Префикс сообщения с изменяемым контекстом запроса
+CONTEXT_PREFIX = "Используй следующую информацию для ответа на вопрос пользователя: "
+
+# Ответ на пакетный запрос: "[1] ответ\n[2] ответ ..."
+BATCH_ANSWER_RE = re.compile(r"^\s*\[(\d+)\]\s*(.*?)(?=^\s*\[\d+\]|\Z)", re.M | re.S)
+# Метки вида [2] в тексте пользователя: экранируются, чтобы не подменить чужой ответ
+BATCH_MARKER_RE = re.compile(r"\[\s*(\d+)\s*\]")
+
+BATCH_INSTRUCTION = (
+    "Ниже приведены несколько независимых запросов, пронумерованных в квадратных скобках. "
+    "Ответь на каждый из них отдельно и в том же порядке. Каждый ответ начинай с новой строки "
+    "с тем же номером в квадратных скобках, например: [1] ответ. Больше ничего не добавляй."
+)
+
+class OpenRouterStreamError(RuntimeError):
+    """Потоковая генерация оборвалась: уже выданные фрагменты не являются полным ответом."""
+
 
 class OpenRouterAPI:
     def __init__(self):
+        # Загрузка переменных окружения из .env файла (один раз на процесс)
+        load_env()
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OpenRouter API ключ не найден. Убедитесь, что он указан в .env файле.")
@@ -16,28 +57,145 @@ class OpenRouterAPI:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # Одна сессия на клиент: соединение с OpenRouter (TCP + TLS) переиспользуется
+        # между запросами, пул рассчитан на одновременные запросы разных пользователей;
+        # 429 и 5xx повторяются автоматически
+        self.session = make_session(headers=self.headers)
+        # Одинаковые запросы (модель, промпты, контекст) отвечаются из памяти
+        self._cache = TTLCache(
+            maxsize=RESPONSE_CACHE_MAX,
+            ttl=int(os.getenv("OPENROUTER_CACHE_TTL", "3600")),
+        )
+        # Одновременные одинаковые запросы выполняются один раз, остальные ждут результат
+        self._singleflight = SingleFlight()
     
-    def generate_response(self, prompt, context=None, model="openai/gpt-5-mini"):
+    def generate_response(self, prompt, context=None, model=DEFAULT_MODEL, system_prompt=None):
         """
         Генерирует ответ на основе промпта и контекста с использованием указанной модели.
         
+        Статический системный промпт отправляется первым отдельным сообщением,
+        чтобы провайдер мог кэшировать этот префикс между запросами; изменяемый
+        контекст идет после него.
+        
         Args:
             prompt (str): Вопрос или промпт для модели
             context (str, optional): Дополнительный контекст для модели
             model (str, optional): Идентификатор модели для использования
+            system_prompt (str, optional): Неизменный системный промпт (кэшируемый префикс)
             
         Returns:
             str: Ответ от модели
         """
+        key = self._cache_key(prompt, context, model, system_prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        return self._singleflight.do(key, self._complete, key, prompt, context, model, system_prompt)
+    
+    def _complete(self, key, prompt, context, model, system_prompt):
+        """Выполняет запрос chat/completions и кэширует успешный ответ."""
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(prompt, context, model, system_prompt)
+        
+        try:
+            response = self.session.post(url, data=orjson.dumps(payload), timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            
+            result = orjson.loads(response.content)
+            self._log_usage(model, result.get("usage"))
+            content = result["choices"][0]["message"]["content"]
+            self._cache.set(key, content)
+            return content
+        except requests.exceptions.RequestException as e:
+            return f"Ошибка при обращении к OpenRouter API: {str(e)}"
+        except (KeyError, IndexError, ValueError) as e:
+            return f"Ошибка при обработке ответа от OpenRouter API: {str(e)}"
+
+    def generate_response_stream(self, prompt, context=None, model=DEFAULT_MODEL, system_prompt=None):
+        """
+        Генерирует ответ в режиме потоковой передачи (SSE), отдавая текст по мере генерации.
+        
+        Args:
+            prompt (str): Вопрос или промпт для модели
+            context (str, optional): Дополнительный контекст для модели
+            model (str, optional): Идентификатор модели для использования
+            system_prompt (str, optional): Неизменный системный промпт (кэшируемый префикс)
+            
+        Yields:
+            str: Очередной фрагмент ответа модели
+            
+        Raises:
+            OpenRouterStreamError: Запрос не удался или поток оборвался до конца ответа
+        """
+        key = self._cache_key(prompt, context, model, system_prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
         url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(prompt, context, model, system_prompt)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}  # расход токенов приходит последним событием
+        parts = []
+        finished = False
         
+        try:
+            with self.session.post(url, data=orjson.dumps(payload), stream=True, timeout=REQUEST_TIMEOUT) as response:
+                response.raise_for_status()
+                # Строки читаются байтами: text/event-stream приходит без charset, и requests
+                # декодировал бы их как ISO-8859-1; orjson сам разбирает UTF-8
+                for line in response.iter_lines():
+                    # Пустые строки разделяют события, строки с ":" — служебные комментарии
+                    if not line or not line.startswith(b"data:"):
+                        continue
+                    data = line[len(b"data:"):].strip()
+                    if data == b"[DONE]":
+                        finished = True
+                        break
+                    chunk = orjson.loads(data)
+                    if "error" in chunk:
+                        raise OpenRouterStreamError(
+                            f"Ошибка при обработке ответа от OpenRouter API: {chunk['error']}"
+                        )
+                    if chunk.get("usage"):
+                        self._log_usage(model, chunk["usage"])
+                    for choice in chunk.get("choices", []):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+                        if choice.get("finish_reason"):
+                            finished = True
+        except requests.exceptions.RequestException as e:
+            raise OpenRouterStreamError(f"Ошибка при обращении к OpenRouter API: {str(e)}") from e
+        except ValueError as e:
+            raise OpenRouterStreamError(f"Ошибка при обработке ответа от OpenRouter API: {str(e)}") from e
+        if not finished:
+            raise OpenRouterStreamError("Ошибка при обработке ответа от OpenRouter API: поток оборвался")
+        # Кэшируется только ответ, полученный целиком
+        if parts:
+            self._cache.set(key, "".join(parts))
+    
+    @staticmethod
+    def _cache_key(prompt, context, model, system_prompt):
+        """Ключ кэша ответов: SHA-256 от модели, системного промпта, контекста и промпта."""
+        raw = f"{model}\0{system_prompt or ''}\0{context or ''}\0{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _build_payload(self, prompt, context, model, system_prompt):
+        """Собирает тело запроса chat/completions."""
         messages = []
         
+        # Статический префикс: одинаков во всех запросах и кэшируется провайдером
+        if system_prompt:
+            messages.append(self._build_system_message(system_prompt, model))
+        
         # Добавляем контекст, если он предоставлен
         if context:
             messages.append({
                 "role": "system",
-                "content": f"Используй следующую информацию для ответа на вопрос пользователя: {context}"
+                "content": CONTEXT_PREFIX + context
             })
         
         # Добавляем промпт пользователя
@@ -46,18 +204,71 @@ class OpenRouterAPI:
             "content": prompt
         })
         
-        payload = {
+        return {
             "model": model,
-            "messages": messages
+            "messages": messages,
+            "usage": {"include": True},
         }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _build_system_message(system_prompt, model):
+        """
+        Формирует системное сообщение со статическим промптом.
         
-        try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
+        Для провайдеров, которым нужна явная метка, добавляется cache_control.
+        Промпт не меняется между запросами, поэтому сообщение собирается один раз
+        на пару (промпт, модель); возвращаемый словарь нельзя изменять.
+        """
+        if model.startswith(CACHE_CONTROL_MODEL_PREFIXES):
+            return {
+                "role": "system",
+                "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
+            }
+        return {"role": "system", "content": system_prompt}
+    
+    @staticmethod
+    def _log_usage(model, usage):
+        """Логирует расход токенов, включая токены, взятые из кэша промпта."""
+        if not usage:
+            return
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        logger.info(
+            "OpenRouter usage (%s): prompt=%s (cached=%s), completion=%s",
+            model, usage.get("prompt_tokens"), cached_tokens, usage.get("completion_tokens"),
+        )
+    
+    def generate_batch_response(self, prompts, context=None, model=DEFAULT_MODEL, batch_context=None):
+        """
+        Отвечает на несколько независимых промптов с общим контекстом одним запросом к модели.
+        
+        Промпты нумеруются как [1], [2], ..., а ответ разбирается по тем же номерам;
+        метки [n] внутри самих промптов экранируются.
+        Если ответ на какой-то промпт не удалось выделить, он запрашивается отдельно.
+        
+        Args:
+            prompts (list[str]): Промпты пользователей
+            context (str, optional): Общий контекст для всех промптов
+            model (str, optional): Идентификатор модели для использования
+            batch_context (str, optional): Контекст пакетного запроса вместо context,
+                если context требует ответа в другом формате (например, одним словом)
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        except requests.exceptions.RequestException as e:
-            return f"Ошибка при обращении к OpenRouter API: {str(e)}"
-        except (KeyError, IndexError) as e:
-            return f"Ошибка при обработке ответа от OpenRouter API: {str(e)}"
+        Returns:
+            list[str]: Ответы в порядке промптов
+        """
+        if len(prompts) == 1:
+            return [self.generate_response(prompts[0], context=context, model=model)]
+        
+        # Промпт сводится в одну строку, а его метки [n] — в (n), чтобы текст одного
+        # пользователя не мог выдать себя за ответ на промпт другого
+        safe_prompts = [BATCH_MARKER_RE.sub(r"(\1)", " ".join(prompt.split())) for prompt in prompts]
+        numbered = "\n".join(f"[{i}] {prompt}" for i, prompt in enumerate(safe_prompts, 1))
+        response = self.generate_response(
+            f"{BATCH_INSTRUCTION}\n\n{numbered}", context=batch_context or context, model=model
+        )
+        answers = {int(match.group(1)): match.group(2).strip() for match in BATCH_ANSWER_RE.finditer(response)}
+        
+        return [
+            answers.get(i) or self.generate_response(prompt, context=context, model=model)
+            for i, prompt in enumerate(prompts, 1)
+        ]
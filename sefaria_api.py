@@ -1,12 +1,43 @@
+import orjson
 import requests
 from urllib.parse import quote
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_utils import TTLCache
+from http_utils import make_session
+
+logger = logging.getLogger(__name__)
+
+# Таймауты (подключение, чтение) в секундах
+REQUEST_TIMEOUT = (3.05, 30)
+
+
+# Поля результата поиска, которые нужны боту: Sefaria возвращает только их
+SEARCH_SOURCE_FIELDS = ("ref", "title", "content")
+
+
+@functools.lru_cache(maxsize=4096)
+def _encode_ref(ref):
+    """Переводит ссылку в формат tref и кодирует ее для URL."""
+    return quote(ref.replace(" ", "_").replace(":", "."))
+
 
 class SefariaAPI:
+    # Тексты и связи по ссылке практически не меняются: успешные ответы кэшируются
+    # на уровне процесса без срока жизни (вытесняются только по размеру).
+    # Возвращаемые из кэша объекты общие, изменять их нельзя.
+    _text_cache = TTLCache(maxsize=2048)
+    _links_cache = TTLCache(maxsize=2048)
+
     def __init__(self):
         self.base_url = "https://www.sefaria.org/api"
+        # Общая keep-alive сессия для всех запросов к Sefaria
+        self.session = make_session()
     
-    def search_texts(self, query, limit=10, search_type='text', field='exact', slop=0, start=0):
+    def search_texts(self, query, limit=10, search_type='text', field='exact', slop=0, start=0,
+                     source_fields=SEARCH_SOURCE_FIELDS):
         """
         Поиск текстов в Sefaria по ключевому слову или фразе с расширенными параметрами.
 
@@ -17,6 +48,8 @@ class SefariaAPI:
             field (str, optional): Поле для поиска: 'exact' или 'naive_lemmatizer' (по умолчанию 'exact').
             slop (int, optional): Максимальное расстояние между словами (по умолчанию 0).
             start (int, optional): Номер первого возвращаемого результата (по умолчанию 0).
+            source_fields (tuple, optional): Поля _source, которые вернет Sefaria
+                (по умолчанию ref, title, content; None — все поля).
 
         Returns:
             list: Список найденных текстов.
@@ -31,30 +64,40 @@ class SefariaAPI:
             "start": start,
             "size": limit
         }
+        if source_fields:
+            # Без лишних полей ответ заметно меньше, и разбирать его быстрее
+            payload["source_proj"] = list(source_fields)
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.session.post(url, headers=headers, data=orjson.dumps(payload), timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             return result.get("hits", {}).get("hits", [])
         except requests.exceptions.RequestException as e:
             logging.error(f"Ошибка при обращении к Sefaria API: {e}")
             return []
+        except ValueError as e:
+            logging.error(f"Ошибка при разборе ответа Sefaria API: {e}")
+            return []
         
     def get_text(self, ref):
-        # Конвертируем ref в tref формат
-        tref = ref.replace(" ", "_").replace(":", ".")
-        encoded_ref = quote(tref)  # Кодируем для URL
+        cached = self._text_cache.get(ref)
+        if cached is not None:
+            return cached
         
-        url = f"{self.base_url}/texts/{encoded_ref}"
-        print(f"Debug: Requesting URL: {url}")  # Для отладки
+        url = f"{self.base_url}/texts/{_encode_ref(ref)}"
+        logger.debug("Requesting URL: %s", url)
         
         try:
-            response = requests.get(url, headers={"accept": "application/json"})
+            response = self.session.get(url, headers={"accept": "application/json"}, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            return response.json()
+            text_data = orjson.loads(response.content)
+            # На неверную ссылку Sefaria отвечает 200 с {"error": ...}: такое не кэшируем
+            if text_data and "error" not in text_data:
+                self._text_cache.set(ref, text_data)
+            return text_data
         except Exception as e:
-            print(f"Error: {str(e)}")
+            logger.error("Ошибка при получении текста %s из Sefaria API: %s", ref, e)
             return None
     
     def get_links(self, ref):
@@ -67,17 +110,46 @@ class SefariaAPI:
         Returns:
             list: Список связанных текстов и комментариев
         """
+        cached = self._links_cache.get(ref)
+        if cached is not None:
+            return cached
+        
         url = f"{self.base_url}/links/{ref}"
         
         try:
-            response = requests.get(url)
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            return response.json()
+            links = orjson.loads(response.content)
+            # Успешный ответ — список; ошибка приходит словарем {"error": ...}
+            if isinstance(links, list) and links:
+                self._links_cache.set(ref, links)
+            return links
         except requests.exceptions.RequestException as e:
-            print(f"Ошибка при обращении к Sefaria API: {str(e)}")
+            logger.error("Ошибка при обращении к Sefaria API: %s", e)
+            return []
+        except ValueError as e:
+            logger.error("Ошибка при разборе ответа Sefaria API: %s", e)
             return []
     
+    def get_text_bundle(self, ref):
+        """
+        Получает текст и связанные с ним тексты одновременно.
+        
+        Запросы get_text и get_links независимы, поэтому выполняются параллельно
+        через общую сессию: время ответа равно самому долгому запросу, а не их сумме.
+        
+        Args:
+            ref (str): Ссылка на текст в формате Sefaria
+            
+        Returns:
+            dict: {"text": результат get_text, "links": результат get_links}
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            text_future = executor.submit(self.get_text, ref)
+            links_future = executor.submit(self.get_links, ref)
+        return {"text": text_future.result(), "links": links_future.result()}
+    
     def format_search_results(self, results):
         """
         Форматирует результаты поиска в удобочитаемый текст.
@@ -91,16 +163,16 @@ class SefariaAPI:
         if not results:
             return "Результаты не найдены."
         
-        formatted_results = []
-        for hit in results:
-            source = hit.get("_source", {})
-            ref = source.get("ref", "Неизвестная ссылка")
-            title = source.get("title", "Без названия")
-            snippet = source.get("content", "")
-            
-            formatted_results.append(f"📜 {ref} - {title}\n{snippet}\n")
-        
-        return "\n".join(formatted_results)
+        return "\n".join(self._format_search_hit(hit) for hit in results)
+    
+    @staticmethod
+    def _format_search_hit(hit):
+        """Форматирует один результат поиска."""
+        source = hit.get("_source", {})
+        ref = source.get("ref", "Неизвестная ссылка")
+        title = source.get("title", "Без названия")
+        snippet = source.get("content", "")
+        return f"📜 {ref} - {title}\n{snippet}\n"
     
     def format_text(self, text_data):
         """
@@ -120,6 +192,6 @@ class SefariaAPI:
         text = text_data.get("text", "")
         
         if isinstance(text, list):
-            text = "\n".join([str(t) for t in text])
+            text = "\n".join(map(str, text))
         
         return f"📜 {ref} ({he_ref})\n\n{text}"
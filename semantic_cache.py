@@ -0,0 +1,97 @@
+"""
+Lookup of reworded repeat queries for the response cache.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Tuple
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and drop punctuation, collapsing whitespace."""
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+def query_tokens(text: str) -> FrozenSet[str]:
+    """The set of lowercase words of ``text``; punctuation and word order are ignored."""
+    return frozenset(WORD_RE.findall(text.lower()))
+
+
+class SimilarQueryIndex:
+    """Maps a query to the cache key of an already answered query with the same words.
+
+    Two queries match only when their normalized word sets are equal, which
+    absorbs differences in case, punctuation, word order and repeated words
+    but never conflates questions that differ by a single word ("включать" /
+    "выключать", an added "не", another date or chapter). Entries older than
+    ``ttl`` seconds — the lifetime of the cached answers — are ignored and
+    pruned from SQLite. The index is persisted next to the response cache;
+    only the newest ``max_entries`` queries of a namespace are kept in memory.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: Optional[float] = None, max_entries: int = 2048) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[FrozenSet[str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS similar_queries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, query TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._prune()
+        rows = self._conn.execute(
+            "SELECT key, query, created_at FROM similar_queries WHERE namespace = ? ORDER BY created_at DESC LIMIT ?",
+            (namespace, max_entries),
+        ).fetchall()
+        for key, query, created_at in reversed(rows):
+            self._remember(query_tokens(query), key, created_at)
+
+    def find(self, query: str) -> Optional[str]:
+        """Return the cache key of a live stored query with the same word set."""
+        tokens = query_tokens(query)
+        with self._lock:
+            entry = self._entries.get(tokens)
+        if entry is None:
+            return None
+        key, created_at = entry
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            return None
+        return key
+
+    def add(self, query: str, key: str) -> None:
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._remember(query_tokens(normalized), key, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO similar_queries (namespace, key, query, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, normalized, now),
+            )
+            self._prune()
+
+    def _prune(self) -> None:
+        # Rows of every namespace expire together with the answers they point to
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM similar_queries WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def _remember(self, tokens: FrozenSet[str], key: str, created_at: float) -> None:
+        if not tokens:
+            return
+        self._entries[tokens] = (key, created_at)
+        self._entries.move_to_end(tokens)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -3,171 +3,211 @@
 Скрипт для тестирования API Sefaria, OpenRouter и Hebcal.
 Проверяет доступность API и корректность работы модулей.
 """
+import asyncio
+import functools
+import io
 import time
 import os
 import sys
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pytest
 from dotenv import load_dotenv
 from openrouter_api import OpenRouterAPI
 from sefaria_api import SefariaAPI
+import hebcal_api
 from hebcal_api import HebcalAPI
+from http_test_cache import HEBCAL_CACHE_TTLS, mount_disk_cache
 
-def test_sefaria_api():
-    """Тестирование API Sefaria"""
-    print("\n=== Тестирование Sefaria API ===")
+# Дисковый кэш GET-запросов для повторных запусков скрипта: включается флагом --cache.
+# pytest по умолчанию всегда обращается к живым API
+USE_HTTP_CACHE = "--cache" in sys.argv
+
+# Вывод каждого набора тестов печатается одним блоком после его завершения;
+# флаг --stream печатает строки сразу, а наборы выполняются по очереди
+STREAM_OUTPUT = "--stream" in sys.argv
+
+# Поля, которые должны быть в ответе Sefaria на запрос текста
+REQUIRED_TEXT_FIELDS = frozenset(("text", "he", "ref", "heRef", "sectionRef"))
+
+def check_sefaria_api(out=None):
+    """
+    Тестирование API Sefaria
+    
+    Args:
+        out (io.TextIOBase, optional): Куда писать вывод (по умолчанию stdout)
+    """
+    p = functools.partial(print, file=out)
+    p("\n=== Тестирование Sefaria API ===")
     
     try:
         sefaria = SefariaAPI()
+        if USE_HTTP_CACHE:
+            mount_disk_cache(sefaria.session)
         all_tests_passed = True
+        query = "Torah"
+        phrase_query = "In the beginning"
+        special_query = "Moses & Aaron"
+        ref = "Genesis 1:1"
+        invalid_ref = "NonExistentBook 999:999"
+        
+        # Запросы независимы друг от друга: отправляем их одновременно,
+        # а проверки ниже идут по уже полученным ответам
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results_future = executor.submit(sefaria.search_texts, query, limit=3)
+            lemma_future = executor.submit(sefaria.search_texts, query, limit=3, field="naive_lemmatizer")
+            slop_future = executor.submit(sefaria.search_texts, phrase_query, slop=5)
+            special_future = executor.submit(sefaria.search_texts, special_query)
+            invalid_future = executor.submit(sefaria.get_text, invalid_ref)
+            # Текст и связанные тексты get_text_bundle сам запрашивает параллельно
+            bundle = sefaria.get_text_bundle(ref)
+        results = results_future.result()
+        results_lemma = lemma_future.result()
+        results_slop = slop_future.result()
+        results_special = special_future.result()
+        invalid_text_data = invalid_future.result()
+        text_data, links_data = bundle["text"], bundle["links"]
+        
         # Тест поиска с разными параметрами
-        print("\nТест поиска с разными настройками:")
+        p("\nТест поиска с разными настройками:")
 
         # Обычный поиск
-        query = "Torah"
-        print(f"Поиск по запросу (exact match): '{query}'")
-        results = sefaria.search_texts(query, limit=3)
+        p(f"Поиск по запросу (exact match): '{query}'")
         if results and isinstance(results, list):
-            print(f"Найдено результатов: {len(results)}")
+            p(f"Найдено результатов: {len(results)}")
             first_result = results[0] if results else {}
             source = first_result.get("_source", {})
-            print(f"- Ссылка: {source.get('ref', 'Н/Д')}")
-            print(f"- Заголовок: {source.get('title', 'Н/Д')}")
-            print("Тест точного поиска: УСПЕШНО")
+            p(f"- Ссылка: {source.get('ref', 'Н/Д')}")
+            p(f"- Заголовок: {source.get('title', 'Н/Д')}")
+            p("Тест точного поиска: УСПЕШНО")
         else:
-            print("Тест точного поиска: НЕУДАЧА")
+            p("Тест точного поиска: НЕУДАЧА")
 
         # Лемматизированный поиск
-        print(f"\nПоиск с лемматизацией ('naive_lemmatizer') по '{query}'")
-        results_lemma = sefaria.search_texts(query, limit=3, field="naive_lemmatizer")
+        p(f"\nПоиск с лемматизацией ('naive_lemmatizer') по '{query}'")
         if results_lemma:
-            print(f"Результатов найдено: {len(results_lemma)}")
-            print("Тест лемматизированного поиска: УСПЕШНО")
+            p(f"Результатов найдено: {len(results_lemma)}")
+            p("Тест лемматизированного поиска: УСПЕШНО")
         else:
-            print("Тест лемматизированного поиска: НЕУДАЧА")
+            p("Тест лемматизированного поиска: НЕУДАЧА")
 
         # Поиск с расстоянием между словами (slop)
-        phrase_query = "In the beginning"
-        print(f"\nПоиск фразового запроса с допуском слов ('slop=5'): '{phrase_query}'")
-        results_slop = sefaria.search_texts(phrase_query, slop=5)
+        p(f"\nПоиск фразового запроса с допуском слов ('slop=5'): '{phrase_query}'")
         if results_slop:
-            print(f"Результатов найдено: {len(results_slop)}")
-            print("Тест поиска с допуском слов: УСПЕШНО")
+            p(f"Результатов найдено: {len(results_slop)}")
+            p("Тест поиска с допуском слов: УСПЕШНО")
         else:
-            print("Тест поиска с допуском слов: НЕУДАЧА")
+            p("Тест поиска с допуском слов: НЕУДАЧА")
 
         # Поиск с особыми символами
-        special_query = "Moses & Aaron"
-        print(f"\nПоиск с особыми символами: '{special_query}'")
-        results_special = sefaria.search_texts(special_query)
+        p(f"\nПоиск с особыми символами: '{special_query}'")
         if results_special:
-            print(f"Результатов найдено: {len(results_special)}")
-            print("Тест поиска с особыми символами: УСПЕШНО")
+            p(f"Результатов найдено: {len(results_special)}")
+            p("Тест поиска с особыми символами: УСПЕШНО")
         else:
-            print("Тест поиска с особыми символами: НЕУДАЧА")
+            p("Тест поиска с особыми символами: НЕУДАЧА")
 
         # Тест получения текста на английском
-        print("\nТест получения текста на английском:")
-        ref = "Genesis 1:1"
-        print(f"Получение текста: '{ref}'")
-        text_data = sefaria.get_text(ref)
+        p("\nТест получения текста на английском:")
+        p(f"Получение текста: '{ref}'")
         
         if text_data and "text" in text_data:
-            print(f"Текст получен: {text_data.get('text', '')[:100]}...")
-            print("Тест получения текста на английском: УСПЕШНО")
+            p(f"Текст получен: {text_data.get('text', '')[:100]}...")
+            p("Тест получения текста на английском: УСПЕШНО")
         else:
-            print("Текст не получен. Проверьте подключение к интернету или доступность API.")
-            print("Тест получения текста на английском: НЕУДАЧА")
+            p("Текст не получен. Проверьте подключение к интернету или доступность API.")
+            p("Тест получения текста на английском: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест получения текста на иврите
-        print("\nТест получения текста на иврите:")
-        ref = "Genesis 1:1"
-        print(f"Получение текста на иврите: '{ref}'")
+        p("\nТест получения текста на иврите:")
+        p(f"Получение текста на иврите: '{ref}'")
         
         if text_data and "he" in text_data:
-            print(f"Текст на иврите получен: {text_data.get('he', '')[:100]}...")
-            print("Тест получения текста на иврите: УСПЕШНО")
+            p(f"Текст на иврите получен: {text_data.get('he', '')[:100]}...")
+            p("Тест получения текста на иврите: УСПЕШНО")
         else:
-            print("Текст на иврите не получен. Проверьте доступность API.")
-            print("Тест получения текста на иврите: НЕУДАЧА")
+            p("Текст на иврите не получен. Проверьте доступность API.")
+            p("Тест получения текста на иврите: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест проверки структуры данных текста
-        print("\nТест проверки структуры данных текста:")
-        required_fields = ["text", "he", "ref", "heRef", "sectionRef"]
-        missing_fields = [field for field in required_fields if field not in text_data]
+        p("\nТест проверки структуры данных текста:")
+        missing_fields = sorted(REQUIRED_TEXT_FIELDS - text_data.keys())
         
         if not missing_fields:
-            print("Все необходимые поля присутствуют в ответе API")
-            print("Тест проверки структуры данных: УСПЕШНО")
+            p("Все необходимые поля присутствуют в ответе API")
+            p("Тест проверки структуры данных: УСПЕШНО")
         else:
-            print(f"Отсутствуют следующие поля: {', '.join(missing_fields)}")
-            print("Тест проверки структуры данных: НЕУДАЧА")
+            p(f"Отсутствуют следующие поля: {', '.join(missing_fields)}")
+            p("Тест проверки структуры данных: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест получения связанных текстов
-        print("\nТест получения связанных текстов:")
-        ref = "Genesis 1:1"
-        print(f"Получение связанных текстов для: '{ref}'")
-        links_data = sefaria.get_links(ref)
+        p("\nТест получения связанных текстов:")
+        p(f"Получение связанных текстов для: '{ref}'")
         
         if links_data and isinstance(links_data, list):
-            print(f"Получено связанных текстов: {len(links_data)}")
+            p(f"Получено связанных текстов: {len(links_data)}")
             if len(links_data) > 0:
-                print(f"Пример связанного текста: {links_data[0].get('category', 'Н/Д')} - {links_data[0].get('ref', 'Н/Д')}")
-            print("Тест получения связанных текстов: УСПЕШНО")
+                p(f"Пример связанного текста: {links_data[0].get('category', 'Н/Д')} - {links_data[0].get('ref', 'Н/Д')}")
+            p("Тест получения связанных текстов: УСПЕШНО")
         else:
-            print("Связанные тексты не получены или формат некорректен.")
-            print("Тест получения связанных текстов: НЕУДАЧА")
+            p("Связанные тексты не получены или формат некорректен.")
+            p("Тест получения связанных текстов: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест обработки ошибок при неправильной ссылке
-        print("\nТест обработки ошибок при неправильной ссылке:")
-        invalid_ref = "NonExistentBook 999:999"
-        print(f"Получение текста по неправильной ссылке: '{invalid_ref}'")
-        invalid_text_data = sefaria.get_text(invalid_ref)
+        p("\nТест обработки ошибок при неправильной ссылке:")
+        p(f"Получение текста по неправильной ссылке: '{invalid_ref}'")
         
         if not invalid_text_data or "error" in invalid_text_data:
-            print("API корректно обрабатывает неправильные ссылки")
-            print("Тест обработки ошибок: УСПЕШНО")
+            p("API корректно обрабатывает неправильные ссылки")
+            p("Тест обработки ошибок: УСПЕШНО")
         else:
-            print("API не обрабатывает неправильные ссылки должным образом")
-            print("Тест обработки ошибок: НЕУДАЧА")
+            p("API не обрабатывает неправильные ссылки должным образом")
+            p("Тест обработки ошибок: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест форматирования результатов поиска (опциональный, зависит от результатов поиска)
-        print("\nТест форматирования результатов поиска (опциональный):")
+        p("\nТест форматирования результатов поиска (опциональный):")
         formatted_results = sefaria.format_search_results(results)
         
         if formatted_results and isinstance(formatted_results, str) and len(formatted_results) > 0:
-            print(f"Форматированные результаты: {formatted_results[:100]}...")
-            print("Тест форматирования результатов поиска: УСПЕШНО")
+            p(f"Форматированные результаты: {formatted_results[:100]}...")
+            p("Тест форматирования результатов поиска: УСПЕШНО")
         else:
-            print(f"Форматирование результатов поиска вернуло: {formatted_results}")
-            print("Тест форматирования результатов поиска: ПРОПУЩЕН (опциональный тест)")
+            p(f"Форматирование результатов поиска вернуло: {formatted_results}")
+            p("Тест форматирования результатов поиска: ПРОПУЩЕН (опциональный тест)")
         
         # Тест форматирования текста
-        print("\nТест форматирования текста:")
+        p("\nТест форматирования текста:")
         formatted_text = sefaria.format_text(text_data)
         
         if formatted_text and isinstance(formatted_text, str) and len(formatted_text) > 0:
-            print(f"Форматированный текст: {formatted_text[:100]}...")
-            print("Тест форматирования текста: УСПЕШНО")
+            p(f"Форматированный текст: {formatted_text[:100]}...")
+            p("Тест форматирования текста: УСПЕШНО")
         else:
-            print("Форматирование текста не работает корректно")
-            print("Тест форматирования текста: НЕУДАЧА")
+            p("Форматирование текста не работает корректно")
+            p("Тест форматирования текста: НЕУДАЧА")
             all_tests_passed = False
         
         return all_tests_passed
     
     except Exception as e:
-        print(f"Ошибка при тестировании Sefaria API: {str(e)}")
-        print("Тест Sefaria API: НЕУДАЧА")
+        p(f"Ошибка при тестировании Sefaria API: {str(e)}")
+        p("Тест Sefaria API: НЕУДАЧА")
         return False
 
-def test_openrouter_api():
-    """Тестирование API OpenRouter"""
-    print("\n=== Тестирование OpenRouter API ===")
+def check_openrouter_api(out=None):
+    """
+    Тестирование API OpenRouter
+    
+    Args:
+        out (io.TextIOBase, optional): Куда писать вывод (по умолчанию stdout)
+    """
+    p = functools.partial(print, file=out)
+    p("\n=== Тестирование OpenRouter API ===")
     
     # Загрузка переменных окружения
     load_dotenv()
@@ -175,158 +215,208 @@ def test_openrouter_api():
     # Проверка наличия API ключа
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key or api_key == "your_openrouter_api_key_here":
-        print("API ключ OpenRouter не найден или не изменен с значения по умолчанию.")
-        print("Пожалуйста, добавьте ваш API ключ в файл .env:")
-        print("OPENROUTER_API_KEY=your_openrouter_api_key_here")
+        p("API ключ OpenRouter не найден или не изменен с значения по умолчанию.")
+        p("Пожалуйста, добавьте ваш API ключ в файл .env:")
+        p("OPENROUTER_API_KEY=your_openrouter_api_key_here")
         return False
     
     try:
         openrouter = OpenRouterAPI()
         
         # Тест генерации ответа
-        print("\nТест генерации ответа:")
+        p("\nТест генерации ответа:")
         prompt = "Привет, как дела?"
-        print(f"Промпт: '{prompt}'")
+        p(f"Промпт: '{prompt}'")
         
         response = openrouter.generate_response(prompt)
         
         if response and isinstance(response, str) and len(response) > 0:
-            print(f"Ответ получен: {response[:100]}...")
-            print("Тест генерации ответа: УСПЕШНО")
+            p(f"Ответ получен: {response[:100]}...")
+            p("Тест генерации ответа: УСПЕШНО")
             return True
         else:
-            print("Ответ не получен или некорректен.")
-            print("Тест генерации ответа: НЕУДАЧА")
+            p("Ответ не получен или некорректен.")
+            p("Тест генерации ответа: НЕУДАЧА")
             return False
     
     except Exception as e:
-        print(f"Ошибка при тестировании OpenRouter API: {str(e)}")
-        print("Тест OpenRouter API: НЕУДАЧА")
+        p(f"Ошибка при тестировании OpenRouter API: {str(e)}")
+        p("Тест OpenRouter API: НЕУДАЧА")
         return False
 
-def test_hebcal_api():
-    """Тестирование API Hebcal"""
-    print("\n=== Тестирование Hebcal API ===")
+def check_hebcal_api(out=None):
+    """
+    Тестирование API Hebcal
+    
+    Args:
+        out (io.TextIOBase, optional): Куда писать вывод (по умолчанию stdout)
+    """
+    p = functools.partial(print, file=out)
+    p("\n=== Тестирование Hebcal API ===")
     
     try:
         hebcal = HebcalAPI()
         all_tests_passed = True
+        test_date = "2023-04-15"  # Пример даты
+        current_year = datetime.date.today().year
+        
+        # Запросы независимы друг от друга: отправляем их одновременно,
+        # форматирование и подсчет дней ниже работают с готовыми ответами
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            current_future = executor.submit(hebcal.get_current_hebrew_date)
+            conversion_future = executor.submit(hebcal.convert_date_to_hebrew, test_date)
+            holidays_future = executor.submit(hebcal.get_holidays_for_year, current_year)
+            # Используем координаты Москвы для примера
+            shabbat_future = executor.submit(
+                hebcal.get_shabbat_times, latitude=55.7558, longitude=37.6173, tzid="Europe/Moscow"
+            )
+        current_hebrew_date = current_future.result()
+        hebrew_date = conversion_future.result()
+        holidays = holidays_future.result()
+        shabbat_times = shabbat_future.result()
         
         # Тест получения текущей еврейской даты
-        print("\nТест получения текущей еврейской даты:")
-        current_hebrew_date = hebcal.get_current_hebrew_date()
+        p("\nТест получения текущей еврейской даты:")
         
         if current_hebrew_date and "hebrew" in current_hebrew_date:
-            print(f"Текущая еврейская дата: {current_hebrew_date.get('hebrew', '')}")
-            print("Тест получения текущей еврейской даты: УСПЕШНО")
+            p(f"Текущая еврейская дата: {current_hebrew_date.get('hebrew', '')}")
+            p("Тест получения текущей еврейской даты: УСПЕШНО")
         else:
-            print("Не удалось получить текущую еврейскую дату.")
-            print("Тест получения текущей еврейской даты: НЕУДАЧА")
+            p("Не удалось получить текущую еврейскую дату.")
+            p("Тест получения текущей еврейской даты: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест конвертации григорианской даты в еврейскую
-        print("\nТест конвертации григорианской даты в еврейскую:")
-        test_date = "2023-04-15"  # Пример даты
-        print(f"Конвертация даты: {test_date}")
-        
-        hebrew_date = hebcal.convert_date_to_hebrew(test_date)
+        p("\nТест конвертации григорианской даты в еврейскую:")
+        p(f"Конвертация даты: {test_date}")
         
         if hebrew_date and "hebrew" in hebrew_date:
-            print(f"Еврейская дата: {hebrew_date.get('hebrew', '')}")
-            print("Тест конвертации григорианской даты в еврейскую: УСПЕШНО")
+            p(f"Еврейская дата: {hebrew_date.get('hebrew', '')}")
+            p("Тест конвертации григорианской даты в еврейскую: УСПЕШНО")
         else:
-            print("Не удалось конвертировать дату.")
-            print("Тест конвертации григорианской даты в еврейскую: НЕУДАЧА")
+            p("Не удалось конвертировать дату.")
+            p("Тест конвертации григорианской даты в еврейскую: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест получения праздников
-        print("\nТест получения еврейских праздников:")
-        current_year = datetime.date.today().year
-        print(f"Получение праздников на {current_year} год")
-        
-        holidays = hebcal.get_holidays_for_year(current_year)
+        p("\nТест получения еврейских праздников:")
+        p(f"Получение праздников на {current_year} год")
         
         if holidays and "items" in holidays and len(holidays["items"]) > 0:
-            print(f"Получено праздников: {len(holidays['items'])}")
-            print(f"Пример праздника: {holidays['items'][0].get('title', '')}")
-            print("Тест получения еврейских праздников: УСПЕШНО")
+            p(f"Получено праздников: {len(holidays['items'])}")
+            p(f"Пример праздника: {holidays['items'][0].get('title', '')}")
+            p("Тест получения еврейских праздников: УСПЕШНО")
         else:
-            print("Не удалось получить информацию о праздниках.")
-            print("Тест получения еврейских праздников: НЕУДАЧА")
+            p("Не удалось получить информацию о праздниках.")
+            p("Тест получения еврейских праздников: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест получения времени Шаббата
-        print("\nТест получения времени Шаббата:")
-        # Используем координаты Москвы для примера
-        shabbat_times = hebcal.get_shabbat_times(latitude=55.7558, longitude=37.6173, tzid="Europe/Moscow")
+        p("\nТест получения времени Шаббата:")
         
         if shabbat_times and "items" in shabbat_times and len(shabbat_times["items"]) > 0:
-            print(f"Получено элементов: {len(shabbat_times['items'])}")
-            print("Тест получения времени Шаббата: УСПЕШНО")
+            p(f"Получено элементов: {len(shabbat_times['items'])}")
+            p("Тест получения времени Шаббата: УСПЕШНО")
         else:
-            print("Не удалось получить информацию о времени Шаббата.")
-            print("Тест получения времени Шаббата: НЕУДАЧА")
+            p("Не удалось получить информацию о времени Шаббата.")
+            p("Тест получения времени Шаббата: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест подсчета дней до события
-        print("\nТест подсчета дней до события:")
+        p("\nТест подсчета дней до события:")
         future_date = (datetime.date.today() + datetime.timedelta(days=30)).strftime('%Y-%m-%d')
-        print(f"Подсчет дней до даты: {future_date}")
+        p(f"Подсчет дней до даты: {future_date}")
         
         days = hebcal.days_until_event(future_date)
         
         if isinstance(days, int):
-            print(f"Дней до события: {days}")
-            print("Тест подсчета дней до события: УСПЕШНО")
+            p(f"Дней до события: {days}")
+            p("Тест подсчета дней до события: УСПЕШНО")
         else:
-            print("Не удалось подсчитать количество дней до события.")
-            print("Тест подсчета дней до события: НЕУДАЧА")
+            p("Не удалось подсчитать количество дней до события.")
+            p("Тест подсчета дней до события: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест форматирования еврейской даты
-        print("\nТест форматирования еврейской даты:")
+        p("\nТест форматирования еврейской даты:")
         formatted_date = hebcal.format_hebrew_date(current_hebrew_date)
         
         if formatted_date and isinstance(formatted_date, str) and len(formatted_date) > 0:
-            print(f"Форматированная дата: {formatted_date[:100]}...")
-            print("Тест форматирования еврейской даты: УСПЕШНО")
+            p(f"Форматированная дата: {formatted_date[:100]}...")
+            p("Тест форматирования еврейской даты: УСПЕШНО")
         else:
-            print("Не удалось отформатировать еврейскую дату.")
-            print("Тест форматирования еврейской даты: НЕУДАЧА")
+            p("Не удалось отформатировать еврейскую дату.")
+            p("Тест форматирования еврейской даты: НЕУДАЧА")
             all_tests_passed = False
         
         # Тест форматирования праздников
-        print("\nТест форматирования праздников:")
+        p("\nТест форматирования праздников:")
         formatted_holidays = hebcal.format_holidays(holidays)
         
         if formatted_holidays and isinstance(formatted_holidays, str) and len(formatted_holidays) > 0:
-            print(f"Форматированные праздники: {formatted_holidays[:100]}...")
-            print("Тест форматирования праздников: УСПЕШНО")
+            p(f"Форматированные праздники: {formatted_holidays[:100]}...")
+            p("Тест форматирования праздников: УСПЕШНО")
         else:
-            print("Не удалось отформатировать праздники.")
-            print("Тест форматирования праздников: НЕУДАЧА")
+            p("Не удалось отформатировать праздники.")
+            p("Тест форматирования праздников: НЕУДАЧА")
             all_tests_passed = False
         
         return all_tests_passed
     
     except Exception as e:
-        print(f"Ошибка при тестировании Hebcal API: {str(e)}")
-        print("Тест Hebcal API: НЕУДАЧА")
+        p(f"Ошибка при тестировании Hebcal API: {str(e)}")
+        p("Тест Hebcal API: НЕУДАЧА")
         return False
 
+# ---------------------------------------------------------------------------
+# Тесты для pytest: наборы независимы, `pytest -n auto` (pytest-xdist)
+# выполняет их в разных процессах
+# ---------------------------------------------------------------------------
+def test_sefaria_api():
+    assert check_sefaria_api()
+
+def test_openrouter_api():
+    load_dotenv()
+    if os.getenv("OPENROUTER_API_KEY") in (None, "", "your_openrouter_api_key_here"):
+        pytest.skip("API ключ OpenRouter не задан в .env")
+    assert check_openrouter_api()
+
+def test_hebcal_api():
+    assert check_hebcal_api()
+
+async def _run_suites(*suites):
+    """
+    Запускает наборы тестов параллельно в отдельных потоках.
+    
+    Вывод каждого набора собирается в свой буфер и печатается целиком
+    в исходном порядке, чтобы строки разных наборов не перемешивались.
+    
+    Returns:
+        list[bool]: Результаты наборов в порядке аргументов
+    """
+    buffers = [io.StringIO() for _ in suites]
+    results = await asyncio.gather(
+        *(asyncio.to_thread(suite, buffer) for suite, buffer in zip(suites, buffers))
+    )
+    sys.stdout.write("".join(buffer.getvalue() for buffer in buffers))
+    sys.stdout.flush()
+    return results
+
 def main():
+    if USE_HTTP_CACHE:
+        # Сессия Hebcal общая для всех экземпляров HebcalAPI
+        mount_disk_cache(hebcal_api._SESSION, ttls=HEBCAL_CACHE_TTLS)
+    
     print("=" * 50)
     print("Тестирование API для Sefaria ChatBot")
     print("=" * 50)
     
-    # Тестирование Sefaria API
-    sefaria_success = test_sefaria_api()
-    
-    # Тестирование OpenRouter API
-    openrouter_success = test_openrouter_api()
-    
-    # Тестирование Hebcal API
-    hebcal_success = test_hebcal_api()
+    suites = (check_sefaria_api, check_openrouter_api, check_hebcal_api)
+    if STREAM_OUTPUT:
+        sefaria_success, openrouter_success, hebcal_success = (suite() for suite in suites)
+    else:
+        # Наборы тестов обращаются к разным API и выполняются одновременно
+        sefaria_success, openrouter_success, hebcal_success = asyncio.run(_run_suites(*suites))
     
     # Итоги тестирования
     print("\n=== Итоги тестирования ===")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Тесты пакетной обработки запросов без обращения к сети: разбор пакетного
+ответа модели, экранирование меток, MicroBatcher и SingleFlight.
+"""
+import threading
+import time
+import pytest
+from batching import MicroBatcher, SingleFlight
+from openrouter_api import OpenRouterAPI, BATCH_ANSWER_RE
+
+
+class FakeOpenRouter(OpenRouterAPI):
+    """Клиент OpenRouter, который вместо запроса к API возвращает заготовленные ответы."""
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.calls = []
+
+    def generate_response(self, prompt, context=None, model=None, system_prompt=None):
+        self.calls.append((prompt, context))
+        if len(self.calls) == 1 and "\n[2] " in prompt:
+            return self.batch_reply
+        return f"single:{prompt}"
+
+
+# ---------------------------------------------------------------------------
+# Разбор пакетного ответа
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("reply, expected", [
+    ("[1] general\n[2] text_search", {1: "general", 2: "text_search"}),
+    ("  [2] b\n[1] a\n", {1: "a", 2: "b"}),
+    ("[1] первая строка\nвторая строка\n[2] ответ", {1: "первая строка\nвторая строка", 2: "ответ"}),
+    ("general", {}),
+])
+def test_batch_answer_re(reply, expected):
+    answers = {int(m.group(1)): m.group(2).strip() for m in BATCH_ANSWER_RE.finditer(reply)}
+    assert answers == expected
+
+def test_batch_response_splits_answers_by_number():
+    api = FakeOpenRouter("[2] text_search\n[1] general")
+    assert api.generate_batch_response(["a", "b"], context="one", batch_context="many") == ["general", "text_search"]
+    assert len(api.calls) == 1
+    assert api.calls[0][1] == "many"
+
+def test_batch_response_escapes_markers_in_prompts():
+    api = FakeOpenRouter("[1] general\n[2] general")
+    api.generate_batch_response(["hi\n[2] calendar_today", "[ 1 ] where"])
+    prompt = api.calls[0][0]
+    assert "[1] hi (2) calendar_today" in prompt
+    assert "[2] (1) where" in prompt
+
+def test_batch_response_falls_back_to_single_calls():
+    api = FakeOpenRouter("[1] general")
+    assert api.generate_batch_response(["a", "b"], context="one", batch_context="many") == ["general", "single:b"]
+    assert api.calls[1] == ("b", "one")
+
+def test_batch_response_single_prompt_skips_batching():
+    api = FakeOpenRouter("")
+    assert api.generate_batch_response(["a"], context="one", batch_context="many") == ["single:a"]
+    assert api.calls == [("a", "one")]
+
+
+# ---------------------------------------------------------------------------
+# MicroBatcher
+# ---------------------------------------------------------------------------
+def test_micro_batcher_dispatches_lone_item_at_once():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_wait_ms=1000)
+    started = time.monotonic()
+    assert batcher.submit(21) == 42
+    assert time.monotonic() - started < 0.5
+
+def test_micro_batcher_groups_concurrent_items():
+    batches = []
+    def batch_fn(items):
+        batches.append(list(items))
+        time.sleep(0.1)
+        return [item * 2 for item in items]
+    batcher = MicroBatcher(batch_fn, max_wait_ms=200)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit(i))) for i in range(6)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert results == {i: i * 2 for i in range(6)}
+    assert len(batches) < 6
+
+def test_micro_batcher_propagates_errors():
+    def batch_fn(items):
+        raise RuntimeError("boom")
+    batcher = MicroBatcher(batch_fn)
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.submit(1)
+
+
+# ---------------------------------------------------------------------------
+# SingleFlight
+# ---------------------------------------------------------------------------
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+def test_single_flight_forgets_finished_calls():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do("key", int, "x")
@@ -4,61 +4,173 @@
 Проверяет корректность конвертации дат в разных годах.
 """
 import datetime
+import functools
+import io
 import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyluach.dates import GregorianDate, HebrewDate
+
+import hebcal_api
 from hebcal_api import HebcalAPI
+from http_test_cache import HEBCAL_CACHE_TTLS, mount_disk_cache
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def test_gregorian_to_hebrew_conversion():
-    """Тестирование конвертации григорианских дат в еврейские"""
-    print("\n=== Тестирование конвертации григорианских дат в еврейские ===")
-    
-    hebcal = HebcalAPI()
-    
-    # Список тестовых дат в разных годах
-    test_dates = [
-        # Текущий год
-        datetime.date.today(),
-        # Прошлые годы
-        datetime.date(2023, 4, 15),
-        datetime.date(2022, 9, 25),
-        datetime.date(2021, 3, 10),
-        datetime.date(2020, 12, 1),
-        datetime.date(2019, 7, 4),
-        datetime.date(2018, 1, 1),
-        # Будущие годы
-        datetime.date(2026, 5, 20),
-        datetime.date(2027, 11, 30),
-        # Особые даты (високосные годы и т.д.)
-        datetime.date(2024, 2, 29),  # Високосный год
-        datetime.date(2000, 1, 1),   # Начало века
-        datetime.date(2100, 12, 31)  # Конец века
-    ]
+# Сколько запросов к конвертеру Hebcal выполняется одновременно
+MAX_PARALLEL_REQUESTS = 16
+
+# Дисковый кэш GET-запросов для повторных запусков скрипта: включается флагом --cache.
+# pytest по умолчанию всегда обращается к живым API
+USE_HTTP_CACHE = "--cache" in sys.argv
+
+# Вывод теста печатается одним блоком после его завершения;
+# флаг --stream печатает строки сразу
+STREAM_OUTPUT = "--stream" in sys.argv
+
+# Один клиент на оба набора тестов
+HEBCAL = HebcalAPI()
+
+# Поля, которые должны быть в ответах конвертера Hebcal
+REQUIRED_HEB_FIELDS = frozenset(("hebrew", "hy", "hm", "hd"))
+REQUIRED_GREG_FIELDS = frozenset(("gy", "gm", "gd"))
+
+# Список тестовых дат в разных годах
+TEST_DATES = [
+    # Текущий год
+    datetime.date.today(),
+    # Прошлые годы
+    datetime.date(2023, 4, 15),
+    datetime.date(2022, 9, 25),
+    datetime.date(2021, 3, 10),
+    datetime.date(2020, 12, 1),
+    datetime.date(2019, 7, 4),
+    datetime.date(2018, 1, 1),
+    # Будущие годы
+    datetime.date(2026, 5, 20),
+    datetime.date(2027, 11, 30),
+    # Особые даты (високосные годы и т.д.)
+    datetime.date(2024, 2, 29),  # Високосный год
+    datetime.date(2000, 1, 1),   # Начало века
+    datetime.date(2100, 12, 31)  # Конец века
+]
+
+# Группы близких дат: каждая конвертируется одним запросом по диапазону (convert_dates_to_hebrew)
+TEST_DATE_WINDOWS = [
+    (datetime.date(2023, 4, 5), datetime.date(2023, 4, 15), datetime.date(2023, 5, 1)),   # Песах
+    (datetime.date(2024, 2, 28), datetime.date(2024, 2, 29), datetime.date(2024, 3, 11)),  # Високосный день, Адар II
+    (datetime.date(2022, 9, 25), datetime.date(2022, 9, 26), datetime.date(2022, 10, 5)),  # Рош ха-Шана, Йом Кипур
+    (datetime.date(2019, 12, 25), datetime.date(2020, 1, 1)),                              # Переход через новый год
+]
+
+# Список тестовых еврейских дат
+TEST_HEBREW_DATES = [
+    {"hy": 5784, "hm": "Nisan", "hd": 15},     # Песах текущего года
+    {"hy": 5783, "hm": "Tishrei", "hd": 1},    # Рош ха-Шана прошлого года
+    {"hy": 5782, "hm": "Kislev", "hd": 25},    # Ханука позапрошлого года
+    {"hy": 5785, "hm": "Sivan", "hd": 6},      # Шавуот следующего года
+    {"hy": 5786, "hm": "Av", "hd": 9},         # 9 Ава через два года
+    {"hy": 5780, "hm": "Adar", "hd": 14},      # Пурим 2020 года
+    {"hy": 5770, "hm": "Elul", "hd": 1},       # 1 Элула 2010 года
+    {"hy": 5800, "hm": "Shvat", "hd": 15},     # Ту би-Шват далекого будущего
+    {"hy": 5750, "hm": "Tamuz", "hd": 17},     # 17 Таммуза 1990 года
+    {"hy": 5700, "hm": "Cheshvan", "hd": 10}   # 10 Хешвана 1939 года
+]
+
+# Номера месяцев в pyluach: счет от Нисана, Адар I — 12-й, Адар II — 13-й
+PYLUACH_MONTHS = {
+    "Nisan": 1, "Iyyar": 2, "Sivan": 3, "Tamuz": 4, "Av": 5, "Elul": 6,
+    "Tishrei": 7, "Cheshvan": 8, "Kislev": 9, "Tevet": 10, "Shvat": 11,
+    "Adar": 12, "Adar I": 12, "Adar II": 13,
+}
+
+# Названия месяцев pyluach, которые Hebcal пишет иначе
+PYLUACH_MONTH_NAMES = {
+    "Nissan": "Nisan", "Iyar": "Iyyar", "Tammuz": "Tamuz", "Teves": "Tevet",
+    "Shevat": "Shvat", "Adar 1": "Adar I", "Adar 2": "Adar II",
+}
+
+def _convert_all(convert, items):
+    """
+    Выполняет конвертацию для всех элементов параллельно.
+    
+    Args:
+        convert (callable): Функция конвертации одного элемента
+        items (list): Элементы для конвертации
+        
+    Returns:
+        list: Результаты в порядке элементов; если конвертация упала,
+              на месте результата стоит исключение
+    """
+    def convert_one(item):
+        try:
+            return convert(item)
+        except Exception as e:
+            return e
+    
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+        return list(executor.map(convert_one, items))
+
+def _api_check_indexes(items):
+    """Индексы дат, обратная конвертация которых проверяется через Hebcal: первая, средняя и последняя."""
+    return {0, len(items) // 2, len(items) - 1}
+
+def _local_gregorian(hebrew_data):
+    """Переводит еврейскую дату в григорианскую локально (pyluach), в формате ответа Hebcal."""
+    month = PYLUACH_MONTHS[HEBCAL.normalize_hebrew_month(hebrew_data["hm"])]
+    date = HebrewDate(int(hebrew_data["hy"]), month, int(hebrew_data["hd"])).to_pydate()
+    return {"gy": date.year, "gm": date.month, "gd": date.day}
+
+def _local_hebrew(date):
+    """Переводит григорианскую дату в еврейскую локально (pyluach), в формате ответа Hebcal."""
+    hebrew_date = GregorianDate.from_pydate(date).to_heb()
+    month = hebrew_date.month_name()
+    return {
+        "hy": hebrew_date.year,
+        "hm": PYLUACH_MONTH_NAMES.get(month, month),
+        "hd": hebrew_date.day,
+        "hebrew": hebrew_date.hebrew_date_string(),
+    }
+
+def check_gregorian_to_hebrew_conversion(out=None):
+    """
+    Тестирование конвертации григорианских дат в еврейские
+    
+    Args:
+        out (io.TextIOBase, optional): Куда писать вывод (по умолчанию stdout)
+    """
+    p = functools.partial(print, file=out)
+    p("\n=== Тестирование конвертации григорианских дат в еврейские ===")
     
     success_count = 0
     failure_count = 0
     
-    for date in test_dates:
-        print(f"\nТестирование даты: {date.strftime('%Y-%m-%d')}")
+    # Прямая конвертация идет пакетом (соседние даты — одним запросом по диапазону).
+    # Обратная конвертация для проверки считается локально; первая, средняя и последняя даты
+    # проверяются через Hebcal, чтобы обратное направление API тоже было покрыто
+    hebrew_results = HEBCAL.convert_dates_to_hebrew(TEST_DATES)
+    api_check_indexes = _api_check_indexes(TEST_DATES)
+    
+    for index, (date, hebrew_data) in enumerate(zip(TEST_DATES, hebrew_results)):
+        p(f"\nТестирование даты: {date.strftime('%Y-%m-%d')}")
         
         try:
             # Конвертация григорианской даты в еврейскую
-            hebrew_data = hebcal.convert_date_to_hebrew(date)
-            
             if "error" in hebrew_data:
-                print(f"ОШИБКА: {hebrew_data.get('error')}")
+                p(f"ОШИБКА: {hebrew_data.get('error')}")
                 failure_count += 1
                 continue
             
             # Проверка наличия необходимых полей
-            required_fields = ["hebrew", "hy", "hm", "hd"]
-            missing_fields = [field for field in required_fields if field not in hebrew_data]
+            missing_fields = sorted(REQUIRED_HEB_FIELDS - hebrew_data.keys())
             
             if missing_fields:
-                print(f"ОШИБКА: Отсутствуют поля {', '.join(missing_fields)}")
-                print(f"Полученные данные: {hebrew_data}")
+                p(f"ОШИБКА: Отсутствуют поля {', '.join(missing_fields)}")
+                p(f"Полученные данные: {hebrew_data}")
                 failure_count += 1
                 continue
             
@@ -69,10 +181,13 @@ def test_gregorian_to_hebrew_conversion():
                 "hd": hebrew_data.get("hd")
             }
             
-            greg_data = hebcal.convert_date_to_gregorian(hebrew_date)
+            if index in api_check_indexes:
+                greg_data = HEBCAL.convert_date_to_gregorian(hebrew_date)
+            else:
+                greg_data = _local_gregorian(hebrew_date)
             
             if "error" in greg_data:
-                print(f"ОШИБКА при обратной конвертации: {greg_data.get('error')}")
+                p(f"ОШИБКА при обратной конвертации: {greg_data.get('error')}")
                 failure_count += 1
                 continue
             
@@ -85,73 +200,68 @@ def test_gregorian_to_hebrew_conversion():
                 )
                 
                 if converted_date == date:
-                    print(f"УСПЕШНО: {date.strftime('%Y-%m-%d')} -> {hebrew_data.get('hebrew')} -> {converted_date.strftime('%Y-%m-%d')}")
+                    p(f"УСПЕШНО: {date.strftime('%Y-%m-%d')} -> {hebrew_data.get('hebrew')} -> {converted_date.strftime('%Y-%m-%d')}")
                     success_count += 1
                 else:
-                    print(f"ОШИБКА: Даты не совпадают: {date.strftime('%Y-%m-%d')} != {converted_date.strftime('%Y-%m-%d')}")
-                    print(f"Еврейская дата: {hebrew_data.get('hebrew')}")
-                    print(f"Исходные данные: {hebrew_data}")
-                    print(f"Данные обратной конвертации: {greg_data}")
+                    p(f"ОШИБКА: Даты не совпадают: {date.strftime('%Y-%m-%d')} != {converted_date.strftime('%Y-%m-%d')}")
+                    p(f"Еврейская дата: {hebrew_data.get('hebrew')}")
+                    p(f"Исходные данные: {hebrew_data}")
+                    p(f"Данные обратной конвертации: {greg_data}")
                     failure_count += 1
             except (ValueError, TypeError) as e:
-                print(f"ОШИБКА при создании объекта даты: {e}")
-                print(f"Данные обратной конвертации: {greg_data}")
+                p(f"ОШИБКА при создании объекта даты: {e}")
+                p(f"Данные обратной конвертации: {greg_data}")
                 failure_count += 1
         
         except Exception as e:
-            print(f"ОШИБКА при тестировании даты {date.strftime('%Y-%m-%d')}: {str(e)}")
+            p(f"ОШИБКА при тестировании даты {date.strftime('%Y-%m-%d')}: {str(e)}")
             failure_count += 1
     
-    print(f"\nИтоги тестирования григорианских дат:")
-    print(f"Успешно: {success_count}")
-    print(f"Неудачно: {failure_count}")
-    print(f"Всего протестировано: {len(test_dates)}")
+    p(f"\nИтоги тестирования григорианских дат:")
+    p(f"Успешно: {success_count}")
+    p(f"Неудачно: {failure_count}")
+    p(f"Всего протестировано: {len(TEST_DATES)}")
     
     return success_count, failure_count
 
-def test_hebrew_to_gregorian_conversion():
-    """Тестирование конвертации еврейских дат в григорианские"""
-    print("\n=== Тестирование конвертации еврейских дат в григорианские ===")
-    
-    hebcal = HebcalAPI()
-    
-    # Список тестовых еврейских дат
-    test_hebrew_dates = [
-        {"hy": 5784, "hm": "Nisan", "hd": 15},     # Песах текущего года
-        {"hy": 5783, "hm": "Tishrei", "hd": 1},    # Рош ха-Шана прошлого года
-        {"hy": 5782, "hm": "Kislev", "hd": 25},    # Ханука позапрошлого года
-        {"hy": 5785, "hm": "Sivan", "hd": 6},      # Шавуот следующего года
-        {"hy": 5786, "hm": "Av", "hd": 9},         # 9 Ава через два года
-        {"hy": 5780, "hm": "Adar", "hd": 14},      # Пурим 2020 года
-        {"hy": 5770, "hm": "Elul", "hd": 1},       # 1 Элула 2010 года
-        {"hy": 5800, "hm": "Shvat", "hd": 15},     # Ту би-Шват далекого будущего
-        {"hy": 5750, "hm": "Tamuz", "hd": 17},     # 17 Таммуза 1990 года
-        {"hy": 5700, "hm": "Cheshvan", "hd": 10}   # 10 Хешвана 1939 года
-    ]
+def check_hebrew_to_gregorian_conversion(out=None):
+    """
+    Тестирование конвертации еврейских дат в григорианские
+    
+    Args:
+        out (io.TextIOBase, optional): Куда писать вывод (по умолчанию stdout)
+    """
+    p = functools.partial(print, file=out)
+    p("\n=== Тестирование конвертации еврейских дат в григорианские ===")
     
     success_count = 0
     failure_count = 0
     
-    for hebrew_date in test_hebrew_dates:
+    # Конвертируем все даты одновременно. Обратная конвертация для проверки
+    # считается локально; первая, средняя и последняя даты проверяются через Hebcal
+    greg_results = _convert_all(HEBCAL.convert_date_to_gregorian, TEST_HEBREW_DATES)
+    api_check_indexes = _api_check_indexes(TEST_HEBREW_DATES)
+    
+    for index, (hebrew_date, greg_data) in enumerate(zip(TEST_HEBREW_DATES, greg_results)):
         hebrew_str = f"{hebrew_date['hy']} {hebrew_date['hm']} {hebrew_date['hd']}"
-        print(f"\nТестирование еврейской даты: {hebrew_str}")
+        p(f"\nТестирование еврейской даты: {hebrew_str}")
         
         try:
             # Конвертация еврейской даты в григорианскую
-            greg_data = hebcal.convert_date_to_gregorian(hebrew_date)
+            if isinstance(greg_data, Exception):
+                raise greg_data
             
             if "error" in greg_data:
-                print(f"ОШИБКА: {greg_data.get('error')}")
+                p(f"ОШИБКА: {greg_data.get('error')}")
                 failure_count += 1
                 continue
             
             # Проверка наличия необходимых полей
-            required_fields = ["gy", "gm", "gd"]
-            missing_fields = [field for field in required_fields if field not in greg_data]
+            missing_fields = sorted(REQUIRED_GREG_FIELDS - greg_data.keys())
             
             if missing_fields:
-                print(f"ОШИБКА: Отсутствуют поля {', '.join(missing_fields)}")
-                print(f"Полученные данные: {greg_data}")
+                p(f"ОШИБКА: Отсутствуют поля {', '.join(missing_fields)}")
+                p(f"Полученные данные: {greg_data}")
                 failure_count += 1
                 continue
             
@@ -164,10 +274,13 @@ def test_hebrew_to_gregorian_conversion():
                 )
                 
                 # Обратная конвертация для проверки
-                hebrew_data = hebcal.convert_date_to_hebrew(greg_date)
+                if index in api_check_indexes:
+                    hebrew_data = HEBCAL.convert_date_to_hebrew(greg_date)
+                else:
+                    hebrew_data = _local_hebrew(greg_date)
                 
                 if "error" in hebrew_data:
-                    print(f"ОШИБКА при обратной конвертации: {hebrew_data.get('error')}")
+                    p(f"ОШИБКА при обратной конвертации: {hebrew_data.get('error')}")
                     failure_count += 1
                     continue
                 
@@ -176,49 +289,121 @@ def test_hebrew_to_gregorian_conversion():
                 returned_month = hebrew_data.get("hm", "")
                 
                 # Используем функцию нормализации из HebcalAPI
-                normalized_original = hebcal.normalize_hebrew_month(original_month)
-                normalized_returned = hebcal.normalize_hebrew_month(returned_month)
+                normalized_original = HEBCAL.normalize_hebrew_month(original_month)
+                normalized_returned = HEBCAL.normalize_hebrew_month(returned_month)
                 
                 # Проверка соответствия дат с учетом нормализации месяцев
                 if (int(hebrew_data.get("hy", 0)) == hebrew_date["hy"] and
                     normalized_returned == normalized_original and
                     int(hebrew_data.get("hd", 0)) == hebrew_date["hd"]):
-                    print(f"УСПЕШНО: {hebrew_str} -> {greg_date.strftime('%Y-%m-%d')} -> {hebrew_data.get('hebrew')}")
+                    p(f"УСПЕШНО: {hebrew_str} -> {greg_date.strftime('%Y-%m-%d')} -> {hebrew_data.get('hebrew')}")
                     success_count += 1
                 else:
-                    print(f"ОШИБКА: Даты не совпадают:")
-                    print(f"Исходная еврейская дата: {hebrew_str}")
-                    print(f"Полученная еврейская дата: {hebrew_data.get('hebrew')}")
-                    print(f"Исходные данные: {hebrew_date}")
-                    print(f"Данные обратной конвертации: {hebrew_data}")
+                    p(f"ОШИБКА: Даты не совпадают:")
+                    p(f"Исходная еврейская дата: {hebrew_str}")
+                    p(f"Полученная еврейская дата: {hebrew_data.get('hebrew')}")
+                    p(f"Исходные данные: {hebrew_date}")
+                    p(f"Данные обратной конвертации: {hebrew_data}")
                     failure_count += 1
             
             except (ValueError, TypeError) as e:
-                print(f"ОШИБКА при создании объекта даты: {e}")
-                print(f"Данные конвертации: {greg_data}")
+                p(f"ОШИБКА при создании объекта даты: {e}")
+                p(f"Данные конвертации: {greg_data}")
                 failure_count += 1
         
         except Exception as e:
-            print(f"ОШИБКА при тестировании даты {hebrew_str}: {str(e)}")
+            p(f"ОШИБКА при тестировании даты {hebrew_str}: {str(e)}")
             failure_count += 1
     
-    print(f"\nИтоги тестирования еврейских дат:")
-    print(f"Успешно: {success_count}")
-    print(f"Неудачно: {failure_count}")
-    print(f"Всего протестировано: {len(test_hebrew_dates)}")
+    p(f"\nИтоги тестирования еврейских дат:")
+    p(f"Успешно: {success_count}")
+    p(f"Неудачно: {failure_count}")
+    p(f"Всего протестировано: {len(TEST_HEBREW_DATES)}")
     
     return success_count, failure_count
 
+# ---------------------------------------------------------------------------
+# Тесты для pytest: каждая дата — отдельный случай, поэтому `pytest -n auto`
+# (pytest-xdist) распределяет их по процессам
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("date", TEST_DATES, ids=str)
+def test_gregorian_to_hebrew(date):
+    """Григорианская дата переводится в еврейскую; обратный перевод проверяется локально."""
+    hebrew_data = HEBCAL.convert_date_to_hebrew(date)
+    assert "error" not in hebrew_data, hebrew_data["error"]
+    assert not REQUIRED_HEB_FIELDS - hebrew_data.keys(), hebrew_data
+    
+    greg_data = _local_gregorian(hebrew_data)
+    assert datetime.date(greg_data["gy"], greg_data["gm"], greg_data["gd"]) == date, hebrew_data
+
+@pytest.mark.parametrize("hebrew_date", TEST_HEBREW_DATES, ids=lambda d: f"{d['hy']}-{d['hm']}-{d['hd']}")
+def test_hebrew_to_gregorian(hebrew_date):
+    """Еврейская дата переводится в григорианскую; обратный перевод проверяется локально."""
+    greg_data = HEBCAL.convert_date_to_gregorian(hebrew_date)
+    assert "error" not in greg_data, greg_data["error"]
+    assert not REQUIRED_GREG_FIELDS - greg_data.keys(), greg_data
+    
+    date = datetime.date(int(greg_data["gy"]), int(greg_data["gm"]), int(greg_data["gd"]))
+    hebrew_data = _local_hebrew(date)
+    assert int(hebrew_data["hy"]) == hebrew_date["hy"]
+    assert HEBCAL.normalize_hebrew_month(hebrew_data["hm"]) == HEBCAL.normalize_hebrew_month(hebrew_date["hm"])
+    assert int(hebrew_data["hd"]) == hebrew_date["hd"]
+
+@pytest.mark.parametrize("dates", TEST_DATE_WINDOWS, ids=lambda dates: f"{dates[0]}..{dates[-1]}")
+def test_range_conversion_matches_single_dates(dates):
+    """Пакетная конвертация по диапазону совпадает с pyluach и с конвертацией по одной дате."""
+    results = HEBCAL.convert_dates_to_hebrew(list(dates))
+    assert len(results) == len(dates)
+    for date, hebrew_data in zip(dates, results):
+        assert "error" not in hebrew_data, hebrew_data["error"]
+        assert not REQUIRED_HEB_FIELDS - hebrew_data.keys(), hebrew_data
+        
+        local = _local_hebrew(date)
+        assert int(hebrew_data["hy"]) == local["hy"]
+        assert HEBCAL.normalize_hebrew_month(hebrew_data["hm"]) == HEBCAL.normalize_hebrew_month(local["hm"])
+        assert int(hebrew_data["hd"]) == local["hd"]
+        
+        # Вызывается после пакетной конвертации: кэш диапазона не подменяет ответ по одной дате
+        single = HEBCAL.convert_date_to_hebrew(date)
+        assert "error" not in single, single["error"]
+        assert {field: single[field] for field in REQUIRED_HEB_FIELDS} == {
+            field: hebrew_data[field] for field in REQUIRED_HEB_FIELDS
+        }
+
+def test_round_trip_through_hebcal():
+    """Перевод туда и обратно целиком через Hebcal покрывает оба направления API."""
+    date = datetime.date(2023, 4, 15)
+    hebrew_data = HEBCAL.convert_date_to_hebrew(date)
+    greg_data = HEBCAL.convert_date_to_gregorian(
+        {"hy": hebrew_data.get("hy"), "hm": hebrew_data.get("hm"), "hd": hebrew_data.get("hd")}
+    )
+    assert "error" not in greg_data, greg_data["error"]
+    assert datetime.date(int(greg_data["gy"]), int(greg_data["gm"]), int(greg_data["gd"])) == date
+
+def _run_buffered(test):
+    """Запускает тест, собирая его вывод в буфер и печатая его одной записью."""
+    if STREAM_OUTPUT:
+        return test()
+    buffer = io.StringIO()
+    result = test(buffer)
+    sys.stdout.write(buffer.getvalue())
+    sys.stdout.flush()
+    return result
+
 def main():
+    if USE_HTTP_CACHE:
+        # Сессия Hebcal общая для всех экземпляров HebcalAPI
+        mount_disk_cache(hebcal_api._SESSION, ttls=HEBCAL_CACHE_TTLS)
+    
     print("=" * 60)
     print("Тестирование конвертации дат между календарями")
     print("=" * 60)
     
     # Тестирование конвертации григорианских дат в еврейские
-    g2h_success, g2h_failure = test_gregorian_to_hebrew_conversion()
+    g2h_success, g2h_failure = _run_buffered(check_gregorian_to_hebrew_conversion)
     
     # Тестирование конвертации еврейских дат в григорианские
-    h2g_success, h2g_failure = test_hebrew_to_gregorian_conversion()
+    h2g_success, h2g_failure = _run_buffered(check_hebrew_to_gregorian_conversion)
     
     # Итоги тестирования
     print("\n" + "=" * 60)